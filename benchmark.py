@@ -0,0 +1,230 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+from mock_server import add_server_arguments
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unknown"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def benchmark_jobs(n_jobs):
+    """n_jobs distinct jobs spread over the default pincode centroids"""
+    from pincode_index import DEFAULT_CENTROIDS
+    return [
+        {
+            'lat': DEFAULT_CENTROIDS[i % len(DEFAULT_CENTROIDS)][1],
+            'lng': DEFAULT_CENTROIDS[i % len(DEFAULT_CENTROIDS)][2],
+            'category': 'Benchmark',
+            'subcategory': f"Item {i}",
+        }
+        for i in range(n_jobs)
+    ]
+
+
+def run_scenario(base_url, workers, n_jobs, per_host, min_interval, page_concurrency, selective_decode,
+                 adaptive_rate=False):
+    """Scrape n_jobs against base_url and return throughput and latency figures
+
+    Runs in a freshly spawned process so peak RSS belongs to this scenario alone.
+    """
+    from simple_edge_scraper import SimpleEdgeBlinkItScraper
+    from job_engine import JobEngine
+    from scraper_cache import DiscoveryCache, LocationCache
+    from rate_limiter import AdaptiveRateLimiter
+
+    class TimedScraper(SimpleEdgeBlinkItScraper):
+        """Counts requests and records how long every job takes"""
+
+        def _get(self, url, **kwargs):
+            with lock:
+                stats['requests'] += 1
+            return super()._get(url, **kwargs)
+
+        def scrape_category_data(self, lat, lng, category_id, subcategory_id):
+            started = time.perf_counter()
+            batch = super().scrape_category_data(lat, lng, category_id, subcategory_id)
+            latencies.append(time.perf_counter() - started)
+            return batch
+
+    lock = threading.Lock()
+    stats = {'requests': 0}
+    latencies = []
+    discovery_cache = DiscoveryCache()
+    location_cache = LocationCache()
+    engine = JobEngine(
+        lambda limiter: TimedScraper(
+            limiter=limiter,
+            discovery_cache=discovery_cache,
+            location_cache=location_cache,
+            page_concurrency=page_concurrency,
+            selective_decode=selective_decode,
+            base_url=base_url
+        ),
+        max_workers=workers,
+        per_host=per_host or workers * page_concurrency,
+        min_interval=min_interval,
+        rate_limiter=AdaptiveRateLimiter() if adaptive_rate else None
+    )
+
+    products = 0
+    succeeded = 0
+    failed = 0
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _, results, error in engine.run(benchmark_jobs(n_jobs)):
+            if error or results is None or results.source == 'mock':
+                failed += 1
+                continue
+            succeeded += 1
+            products += len(results)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'workers': workers,
+        'jobs': n_jobs,
+        'seconds': round(elapsed, 3),
+        'products': products,
+        'products_per_sec': round(products / elapsed, 1) if elapsed else 0.0,
+        'succeeded': succeeded,
+        'failed': failed,
+        'requests': stats['requests'],
+        'requests_per_job': round(stats['requests'] / succeeded, 2) if succeeded else None,
+        'p50_ms': round(float(np.percentile(latencies, 50)) * 1000, 1) if latencies else None,
+        'p99_ms': round(float(np.percentile(latencies, 99)) * 1000, 1) if latencies else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1) if resource is not None else None,
+    }
+
+
+def start_server(args):
+    """Start mock_server.py in its own process so it does not compete for our GIL"""
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mock_server.py'),
+               '--port', '0']
+    for name in ('latency', 'jitter', 'error_rate', 'products', 'description_bytes', 'shape',
+                 'retry_after', 'seed'):
+        command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+    command += ['--error-codes'] + [str(code) for code in args.error_codes]
+    if args.max_rps is not None:
+        command += ['--max-rps', str(args.max_rps)]
+    if args.max_products is not None:
+        command += ['--max-products', str(args.max_products)]
+    if args.no_total:
+        command.append('--no-total')
+    if args.working_paths:
+        command += ['--working-paths'] + args.working_paths
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    # First line is "Serving mock BlinkIt API on <url>"
+    url = process.stdout.readline().split()[-1]
+    return process, url
+
+
+def print_table(results):
+    columns = ['workers', 'jobs', 'products_per_sec', 'requests_per_job', 'p50_ms', 'p99_ms',
+               'peak_rss_mb', 'failed']
+    print('  '.join(f"{column:>16}" for column in columns))
+    for result in results:
+        print('  '.join(f"{str(result[column]):>16}" for column in columns))
+
+
+def check_baseline(results, baseline_path, tolerance):
+    """Names of scenarios whose products/sec fell more than tolerance below the baseline"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['workers'], r['jobs']): r for r in json.load(f)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['workers'], result['jobs']))
+        if previous is None:
+            continue
+        floor = previous['products_per_sec'] * (1 - tolerance)
+        if result['products_per_sec'] < floor:
+            regressions.append(
+                f"{result['workers']} workers x {result['jobs']} jobs: "
+                f"{result['products_per_sec']} products/sec, baseline {previous['products_per_sec']}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a local mock BlinkIt API")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8],
+                        help="Concurrency levels to benchmark")
+    parser.add_argument('--jobs', type=int, nargs='+', default=[50, 200],
+                        help="Job counts to benchmark at every concurrency level")
+    parser.add_argument('--per-host', type=int, default=None,
+                        help="Per-host request cap (default: workers x page concurrency)")
+    parser.add_argument('--min-interval', type=float, default=0.0,
+                        help="Minimum seconds between request starts")
+    parser.add_argument('--page-concurrency', type=int, default=4,
+                        help="Extra result pages of one job fetched concurrently")
+    parser.add_argument('--selective-decode', action='store_true',
+                        help="Benchmark with selective JSON decoding")
+    parser.add_argument('--adaptive-rate', action='store_true',
+                        help="Pace requests with the adaptive rate limiter instead of --min-interval")
+    parser.add_argument('--output', default=None,
+                        help="Write results to this JSON file")
+    parser.add_argument('--baseline', default=None,
+                        help="JSON results of an earlier run; exit non-zero on a throughput regression")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="Allowed fractional drop in products/sec against --baseline")
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server, url = start_server(args)
+    print(f"Mock API running on {url}")
+    results = []
+    try:
+        # Spawned (not forked) workers start from a clean heap, so peak RSS is per scenario
+        context = multiprocessing.get_context('spawn')
+        for workers in args.workers:
+            for n_jobs in args.jobs:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    result = pool.submit(
+                        run_scenario, url, workers, n_jobs, args.per_host, args.min_interval,
+                        args.page_concurrency, args.selective_decode, args.adaptive_rate
+                    ).result()
+                print(f"{workers} workers x {n_jobs} jobs: {result['products_per_sec']} products/sec")
+                results.append(result)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print()
+    print_table(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        regressions = check_baseline(results, args.baseline, args.tolerance)
+        if regressions:
+            print("\nThroughput regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo throughput regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import sqlite3
+import time
+
+
+def job_key(job):
+    """Stable identifier for a (lat, lng, category, subcategory) job"""
+    return f"{float(job['lat']):.6f}|{float(job['lng']):.6f}|{job['category']}|{job['subcategory']}"
+
+
+class JobManifest:
+    """SQLite checkpoint of finished jobs, where their rows went and which endpoint served them"""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_key TEXT PRIMARY KEY,
+                lat REAL,
+                lng REAL,
+                category TEXT,
+                subcategory TEXT,
+                status TEXT NOT NULL,
+                output TEXT,
+                endpoint TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at REAL
+            )
+        """)
+        self.conn.commit()
+
+    def reset(self):
+        """Forget all recorded jobs (a fresh, non-resumed run)"""
+        self.conn.execute("DELETE FROM jobs")
+        self.conn.commit()
+
+    def is_done(self, job):
+        row = self.conn.execute(
+            "SELECT status FROM jobs WHERE job_key = ?", (job_key(job),)
+        ).fetchone()
+        return row is not None and row[0] == 'done'
+
+    def remaining(self, jobs):
+        """Yield only the jobs that are not recorded as done (failed and mock jobs are retried)"""
+        skipped = 0
+        for job in jobs:
+            if self.is_done(job):
+                skipped += 1
+                continue
+            yield job
+        print(f"Resume: skipped {skipped} completed jobs")
+
+    def _upsert(self, job, status, output=None, endpoint=None, error=None):
+        self.conn.execute("""
+            INSERT INTO jobs (job_key, lat, lng, category, subcategory, status, output, endpoint, attempts, error, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?, ?)
+            ON CONFLICT(job_key) DO UPDATE SET
+                status = excluded.status,
+                output = excluded.output,
+                endpoint = excluded.endpoint,
+                attempts = jobs.attempts + 1,
+                error = excluded.error,
+                updated_at = excluded.updated_at
+        """, (job_key(job), job['lat'], job['lng'], job['category'], job['subcategory'],
+              status, output, endpoint, error, time.time()))
+
+    def mark_done(self, completed, output):
+        """Record (job, endpoint) pairs whose rows are durable in output
+
+        Jobs answered with mock data get status 'mock' rather than 'done',
+        so --resume tries the real endpoints for them again.
+        """
+        for job, endpoint in completed:
+            self._upsert(job, 'mock' if endpoint == 'mock' else 'done', output=output, endpoint=endpoint)
+        self.conn.commit()
+
+    def mark_failed(self, job, error):
+        self._upsert(job, 'failed', error=str(error))
+        self.conn.commit()
+
+    def mock_jobs(self, output):
+        """Keys of the jobs whose rows in output are mock data"""
+        return {row[0] for row in self.conn.execute(
+            "SELECT job_key FROM jobs WHERE status = 'mock' AND output = ?", (output,)
+        )}
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        self.conn.close()
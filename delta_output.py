@@ -0,0 +1,165 @@
+import math
+import sqlite3
+import zlib
+
+import numpy as np
+
+from checkpoint import job_key
+from product_schema import CONTEXT_FIELDS, FLAGS, FLAG_COLUMNS, PRODUCT_COLUMNS
+
+# Product columns compared field by field (flags are compared bit by bit)
+VALUE_COLUMNS = [column for column in PRODUCT_COLUMNS
+                 if column != 'product_id' and column not in FLAG_COLUMNS]
+
+# Columns of every change record, ahead of the changed values
+DELTA_COLUMNS = CONTEXT_FIELDS + ['product_id', 'change', 'changed_fields', 'values']
+
+CHANGE_TYPES = ('new', 'changed', 'removed')
+
+
+def plain(value):
+    """NumPy scalars to Python values and NaN to None, so values hash and serialize stably"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _field_hashes(values):
+    """4-byte CRC of each value, concatenated"""
+    return b''.join(zlib.crc32(repr(value).encode('utf-8')).to_bytes(4, 'little') for value in values)
+
+
+def _changed_flags(old, new):
+    """Names of the flags whose value or known bit differs between two packed rows"""
+    nbytes = FLAGS.nbytes
+    diff = np.frombuffer(old, dtype=np.uint8) ^ np.frombuffer(new, dtype=np.uint8)
+    diff = diff[:nbytes] | diff[nbytes:]
+    bits = np.unpackbits(diff, bitorder='little')[:len(FLAGS.names)]
+    return [FLAGS.names[i] for i in np.flatnonzero(bits)]
+
+
+class DeltaTracker:
+    """Remembers a fingerprint of every product last seen per job and diffs new scrapes
+
+    The state is one SQLite row per (job, product_id): a 4-byte hash per
+    value column plus the packed flag bytes, about 130 bytes per product
+    however wide the row is. diff() turns a scraped batch into change
+    records (new, changed with the fields that changed, removed) and stages
+    the new fingerprints; commit() makes them permanent once the records are
+    safely written, so a crash can repeat changes but never lose them.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                scope TEXT NOT NULL,
+                product_id TEXT NOT NULL,
+                fields BLOB NOT NULL,
+                flags BLOB NOT NULL,
+                PRIMARY KEY (scope, product_id)
+            ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def _scopes(self, batch, context):
+        """Row indices of the batch grouped by job scope"""
+        if all(field in batch.context for field in CONTEXT_FIELDS):
+            return {job_key(_job(batch.context)): list(range(len(batch)))}
+        scopes = {}
+        for row in range(len(batch)):
+            job = _job({field: context[field][row] for field in CONTEXT_FIELDS})
+            scopes.setdefault(job_key(job), []).append(row)
+        return scopes
+
+    def diff(self, batch):
+        """Change records for a batch of one or more jobs' complete product lists"""
+        context = {field: batch.column(field) for field in CONTEXT_FIELDS}
+        product_ids = batch.column('product_id')
+        values = [batch.column(column) for column in VALUE_COLUMNS]
+        flags = np.hstack([FLAGS.as_matrix(batch.columns['flags']),
+                           FLAGS.as_matrix(batch.columns['flags_known'])])
+
+        # Flags unpacked for the whole batch, only once some record needs them
+        expanded = None
+        records = []
+        for scope, rows in self._scopes(batch, context).items():
+            previous = {
+                product_id: (fields, packed)
+                for product_id, fields, packed in self.conn.execute(
+                    "SELECT product_id, fields, flags FROM seen WHERE scope = ?", (scope,)
+                )
+            }
+            row_context = {
+                field: plain(batch.context[field]) if field in batch.context else plain(context[field][rows[0]])
+                for field in CONTEXT_FIELDS
+            }
+            updates = []
+            for row in rows:
+                product_id = plain(product_ids[row])
+                if product_id is None:
+                    continue
+                product_id = str(product_id)
+                row_values = [plain(column[row]) for column in values]
+                fields = _field_hashes(row_values)
+                packed = flags[row].tobytes()
+                old = previous.pop(product_id, None)
+                if old is None:
+                    changed = VALUE_COLUMNS + FLAG_COLUMNS
+                    change = 'new'
+                elif old != (fields, packed):
+                    changed = [column for i, column in enumerate(VALUE_COLUMNS)
+                               if old[0][i * 4:i * 4 + 4] != fields[i * 4:i * 4 + 4]]
+                    changed += _changed_flags(old[1], packed)
+                    change = 'changed'
+                else:
+                    continue
+                record = {**row_context, 'product_id': product_id, 'change': change}
+                if change == 'changed':
+                    record['changed_fields'] = changed
+                row_values = dict(zip(VALUE_COLUMNS, row_values))
+                if any(name in FLAGS.index for name in changed):
+                    if expanded is None:
+                        expanded = FLAGS.expand(batch.columns['flags'], batch.columns['flags_known'])
+                    for name in changed:
+                        if name in FLAGS.index:
+                            row_values[name] = plain(expanded[name][row])
+                record['values'] = {name: row_values[name] for name in changed}
+                records.append(record)
+                updates.append((scope, product_id, fields, packed))
+
+            for product_id in previous:
+                records.append({**row_context, 'product_id': product_id, 'change': 'removed'})
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO seen (scope, product_id, fields, flags) VALUES (?, ?, ?, ?)",
+                updates
+            )
+            self.conn.executemany(
+                "DELETE FROM seen WHERE scope = ? AND product_id = ?",
+                [(scope, product_id) for product_id in previous]
+            )
+        return records
+
+    def commit(self):
+        """Make the fingerprints staged by diff() permanent"""
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.rollback()
+        self.conn.close()
+
+
+def _job(context):
+    return {
+        'lat': context['latitude'],
+        'lng': context['longitude'],
+        'category': context['category'],
+        'subcategory': context['subcategory'],
+    }
@@ -0,0 +1,104 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+
+class HostLimiter:
+    """Cap in-flight requests and pace request starts per host
+
+    Starts are paced by a fixed min_interval, or by an optional
+    rate_limiter.AdaptiveRateLimiter that tracks what the server tolerates.
+    """
+
+    def __init__(self, per_host=2, min_interval=0.5, rate_limiter=None):
+        self.per_host = per_host
+        self.min_interval = min_interval
+        self.rate_limiter = rate_limiter
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            return self._semaphores[host]
+
+    def _pace(self, host):
+        """Reserve the next start slot for host and sleep until it arrives"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.min_interval
+        delay = start - now
+        if delay > 0:
+            time.sleep(delay)
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the per-host request slots for the duration of a request"""
+        host = urlsplit(url).netloc
+        with self._semaphore(host):
+            if self.rate_limiter is None:
+                self._pace(host)
+            else:
+                self.rate_limiter.acquire(host)
+            yield
+
+    def record(self, url, status, latency, retry_after=None):
+        """Report a response (status None if the request raised) to the rate limiter"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.record(urlsplit(url).netloc, status, latency, retry_after)
+
+
+class JobEngine:
+    """Run scrape jobs on a thread pool with bounded parallelism"""
+
+    def __init__(self, scraper_factory, max_workers=4, per_host=2, min_interval=0.5, rate_limiter=None):
+        # scraper_factory(limiter) -> scraper; each worker thread gets its own
+        # scraper so requests sessions are never shared between threads
+        self.scraper_factory = scraper_factory
+        self.max_workers = max_workers
+        self.limiter = HostLimiter(per_host, min_interval, rate_limiter)
+        self._local = threading.local()
+
+    def _scraper(self):
+        scraper = getattr(self._local, 'scraper', None)
+        if scraper is None:
+            scraper = self.scraper_factory(self.limiter)
+            self._local.scraper = scraper
+        return scraper
+
+    def _run_job(self, job):
+        return self._scraper().scrape_category_data(
+            job['lat'],
+            job['lng'],
+            job['category'],
+            job['subcategory']
+        )
+
+    def run(self, jobs):
+        """Run jobs concurrently, yielding (job, results, error) as each one finishes"""
+        jobs = iter(jobs)
+        # Only keep a small window of jobs queued so large job streams are
+        # never materialized up front
+        max_pending = self.max_workers * 2
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {}
+            for job in itertools.islice(jobs, max_pending):
+                pending[executor.submit(self._run_job, job)] = job
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = pending.pop(future)
+                    error = future.exception()
+                    results = None if error else future.result()
+                    yield job, results, error
+
+                for job in itertools.islice(jobs, len(done)):
+                    pending[executor.submit(self._run_job, job)] = job
@@ -0,0 +1,145 @@
+import csv
+import hashlib
+import itertools
+import json
+
+from checkpoint import job_key
+
+# Column names accepted for each job field in job/location files
+JOB_COLUMNS = {
+    'lat': ('lat', 'latitude'),
+    'lng': ('lng', 'lon', 'long', 'longitude'),
+    'category': ('category', 'category_id'),
+    'subcategory': ('subcategory', 'subcategory_id', 'sub_category'),
+}
+
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson', '.json')
+
+
+def _normalize(record, fields):
+    """Map a raw CSV/JSON record onto job field names"""
+    lowered = {str(key).strip().lower(): value for key, value in record.items()}
+    job = {}
+    for field in fields:
+        for option in JOB_COLUMNS[field]:
+            if option in lowered and lowered[option] not in (None, ''):
+                job[field] = lowered[option]
+                break
+        else:
+            raise ValueError(f"Record is missing '{field}': {record}")
+    for field in ('lat', 'lng'):
+        if field in job:
+            job[field] = float(job[field])
+    return job
+
+
+def _iter_records(path):
+    """Stream records from a CSV or JSON Lines file"""
+    if path.lower().endswith(JSONL_EXTENSIONS):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    else:
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+
+
+def iter_job_file(path):
+    """Stream jobs (lat, lng, category, subcategory) from a CSV/JSONL file"""
+    for line_number, record in enumerate(_iter_records(path), start=1):
+        try:
+            yield _normalize(record, ('lat', 'lng', 'category', 'subcategory'))
+        except ValueError as e:
+            print(f"Skipping job {line_number} in {path}: {e}")
+
+
+def iter_cross_product(locations_path, categories_path):
+    """Stream every location x (category, subcategory) pair
+
+    Only the category list is held in memory; locations are streamed, and
+    all jobs for one location come out together.
+    """
+    categories = [
+        _normalize(record, ('category', 'subcategory'))
+        for record in _iter_records(categories_path)
+    ]
+    for record in _iter_records(locations_path):
+        try:
+            location = _normalize(record, ('lat', 'lng'))
+        except ValueError as e:
+            print(f"Skipping location in {locations_path}: {e}")
+            continue
+        for category in categories:
+            yield {**location, **category}
+
+
+class JobGroup:
+    """Jobs sharing one resolved location, run back to back"""
+
+    def __init__(self, pincode, location, jobs):
+        self.pincode = pincode
+        self.location = location
+        self.jobs = jobs
+
+    def __len__(self):
+        return len(self.jobs)
+
+
+class JobPlanner:
+    """Deduplicate a job stream and group it by location for cache locality
+
+    Jobs are read in windows of `window` jobs. Within a window they are grouped
+    by rounded coordinates, pincodes are resolved in one batch lookup, and
+    groups are emitted ordered by pincode so neighbouring areas run together.
+    Memory is bounded by the window plus a compact digest per unique job.
+    """
+
+    def __init__(self, pincode_index, window=50000, precision=3):
+        self.pincode_index = pincode_index
+        self.window = window
+        # Coordinates rounded to this many decimals count as one location
+        self.precision = precision
+        self.duplicates = 0
+        self._seen = set()
+
+    def _is_duplicate(self, job):
+        digest = hashlib.blake2b(job_key(job).encode('utf-8'), digest_size=8).digest()
+        if digest in self._seen:
+            self.duplicates += 1
+            return True
+        self._seen.add(digest)
+        return False
+
+    def _plan_window(self, jobs):
+        groups = {}
+        for job in jobs:
+            location = (round(job['lat'], self.precision), round(job['lng'], self.precision))
+            groups.setdefault(location, []).append(job)
+
+        locations = list(groups)
+        pincodes, _ = self.pincode_index.lookup_batch(
+            [lat for lat, _ in locations],
+            [lng for _, lng in locations]
+        )
+        for pincode, location in sorted(zip(pincodes.tolist(), locations)):
+            group_jobs = sorted(groups[location], key=lambda job: (job['category'], job['subcategory']))
+            yield JobGroup(pincode, location, group_jobs)
+
+    def plan(self, jobs):
+        """Yield JobGroups for a (possibly very large) stream of jobs"""
+        jobs = (job for job in jobs if not self._is_duplicate(job))
+        while True:
+            window = list(itertools.islice(jobs, self.window))
+            if not window:
+                break
+            yield from self._plan_window(window)
+        if self.duplicates:
+            print(f"Dropped {self.duplicates} duplicate jobs")
+
+
+def iter_planned_jobs(groups):
+    """Flatten planned groups back into a job stream, keeping group order"""
+    for group in groups:
+        yield from group.jobs
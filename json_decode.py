@@ -0,0 +1,120 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library decoder
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # Selective decoding is optional
+    ijson = None
+
+# Whether select_products / selective decode_response can be used
+SELECTIVE_AVAILABLE = ijson is not None
+
+from product_schema import PRODUCT_FIELDS, TOTAL_COUNT_KEYS
+
+# Keys of an API product object that extraction actually reads
+PRODUCT_SOURCE_KEYS = frozenset(key for _, key, _ in PRODUCT_FIELDS)
+
+# ijson prefixes of the product arrays extract_product_data understands, in
+# the same precedence order as product_schema.find_product_list
+PRODUCT_ARRAY_PREFIXES = ('products.item', 'data.products.item', 'results.item')
+
+# ijson prefixes that may carry the total product count
+TOTAL_COUNT_PREFIXES = frozenset(
+    f"{container}{key}"
+    for container in ('', 'data.', 'meta.', 'pagination.')
+    for key in TOTAL_COUNT_KEYS
+)
+
+_SCALAR_EVENTS = frozenset(('null', 'boolean', 'integer', 'double', 'number', 'string'))
+
+
+def loads(body):
+    """Decode a JSON body straight from bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def select_products(body, keys=PRODUCT_SOURCE_KEYS):
+    """Stream the product array out of body, keeping only the given keys
+
+    Returns (products, total): products is None when no known product array
+    is present, total is None when the response does not advertise one.
+    Requires ijson; nothing outside the wanted keys is materialized.
+    """
+    arrays = {prefix: None for prefix in PRODUCT_ARRAY_PREFIXES}
+    total = None
+    product = None
+    product_prefix = None
+    builder = None
+    builder_key = None
+    builder_depth = 0
+
+    for prefix, event, value in ijson.parse(body, use_float=True):
+        if builder is not None:
+            # Materializing a nested value of a wanted key
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                builder_depth += 1
+            elif event in ('end_map', 'end_array'):
+                builder_depth -= 1
+                if builder_depth == 0:
+                    product[builder_key] = builder.value
+                    builder = None
+            continue
+
+        if product is not None:
+            if event == 'end_map' and prefix == product_prefix:
+                arrays[product_prefix].append(product)
+                product = None
+            elif prefix.startswith(product_prefix) and event != 'map_key':
+                key = prefix[len(product_prefix) + 1:]
+                if '.' in key or key not in keys:
+                    continue
+                if event in _SCALAR_EVENTS:
+                    product[key] = value
+                elif event in ('start_map', 'start_array'):
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    builder_key = key
+                    builder_depth = 1
+            continue
+
+        if prefix in arrays:
+            if event == 'start_map':
+                product = {}
+                product_prefix = prefix
+        elif event == 'start_array' and prefix + '.item' in arrays:
+            # The array exists even if it turns out to be empty
+            arrays[prefix + '.item'] = []
+        elif total is None and prefix in TOTAL_COUNT_PREFIXES and event in ('integer', 'double', 'number', 'string'):
+            try:
+                total = int(value)
+            except (TypeError, ValueError):
+                pass
+
+    for prefix in PRODUCT_ARRAY_PREFIXES:
+        if arrays[prefix] is not None:
+            return arrays[prefix], total
+    return None, total
+
+
+def decode_response(body, selective=False):
+    """Decode a search response body
+
+    In selective mode the product array is streamed and only schema fields
+    are kept, returning {'products': [...], 'total': n}. Bodies without a
+    known product array fall back to a full decode.
+    """
+    if selective and ijson is not None:
+        products, total = select_products(body)
+        if products is not None:
+            response = {'products': products}
+            if total is not None:
+                response['total'] = total
+            return response
+    return loads(body)
@@ -0,0 +1,274 @@
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stages timed separately for every job
+STAGES = ('location', 'network', 'decode', 'extract', 'write')
+
+METRIC_PREFIX = 'blinkit_'
+
+HELP = {
+    'requests_total': "HTTP requests by endpoint path and status",
+    'request_errors_total': "HTTP requests that raised before a response, by endpoint path",
+    'response_bytes_total': "Response body bytes received by endpoint path",
+    'request_seconds': "HTTP request latency by endpoint path",
+    'stage_seconds': "Time spent per pipeline stage",
+    'retries_total': "Requests retried after a backoff, by endpoint path and reason",
+    'mock_fallback_total': "Jobs answered with mock data, by reason",
+    'pincode_far_total': "Pincode lookups whose nearest centroid was beyond the warning distance",
+    'jobs_total': "Finished jobs by result",
+    'products_total': "Products handed to the output sink",
+}
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items())) if labels else ()
+
+
+class Histogram:
+    """Fixed-bucket histogram, cumulative like a Prometheus histogram"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (None if empty)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def to_dict(self):
+        return {
+            'buckets': list(self.buckets),
+            'counts': list(self.counts),
+            'count': self.count,
+            'sum': self.sum,
+        }
+
+
+class Metrics:
+    """Thread-safe counters and histograms shared by every scraper in a run
+
+    Counters and histograms are keyed by name plus a dict of labels, e.g.
+    inc('requests_total', endpoint='/api/v4/search/product', status=200).
+    """
+
+    def __init__(self, exporters=None):
+        self.exporters = exporters or []
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, n=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + n
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, stage):
+        """Time the body of a with block as one observation of stage_seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('stage_seconds', time.perf_counter() - started, stage=stage)
+
+    def counter(self, name, **labels):
+        return self._counters.get((name, _label_key(labels)), 0)
+
+    def counter_total(self, name):
+        """Sum of a counter over all its label sets"""
+        with self._lock:
+            return sum(value for (key, _), value in self._counters.items() if key == name)
+
+    def histogram(self, name, **labels):
+        return self._histograms.get((name, _label_key(labels)))
+
+    def snapshot(self):
+        """Point-in-time copy of every metric as plain JSON-serializable data"""
+        with self._lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {'name': name, 'labels': dict(labels), **histogram.to_dict()}
+                for (name, labels), histogram in sorted(self._histograms.items())
+            ]
+        return {
+            'started_at': self.started_at,
+            'exported_at': time.time(),
+            'counters': counters,
+            'histograms': histograms,
+        }
+
+    def export(self):
+        """Hand a snapshot to every configured exporter"""
+        if not self.exporters:
+            return
+        snapshot = self.snapshot()
+        for exporter in self.exporters:
+            exporter.export(snapshot)
+
+    def stage_summary(self):
+        """One line per timed stage: observations, total and p50/p99 bucket bounds"""
+        lines = []
+        for stage in STAGES:
+            histogram = self.histogram('stage_seconds', stage=stage)
+            if histogram is None:
+                continue
+            lines.append(
+                f"{stage:>8}: {histogram.count} calls, {histogram.sum:.2f}s total, "
+                f"p50 <= {histogram.quantile(0.5)}s, p99 <= {histogram.quantile(0.99)}s"
+            )
+        return lines
+
+
+def merge_snapshots(snapshots):
+    """Sum several snapshots (e.g. one per worker process) into one"""
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for counter in snapshot['counters']:
+            key = (counter['name'], _label_key(counter['labels']))
+            counters[key] = counters.get(key, 0) + counter['value']
+        for histogram in snapshot['histograms']:
+            key = (histogram['name'], _label_key(histogram['labels']))
+            merged = histograms.get(key)
+            if merged is None:
+                merged = histograms[key] = Histogram(tuple(histogram['buckets']))
+            merged.counts = [a + b for a, b in zip(merged.counts, histogram['counts'])]
+            merged.count += histogram['count']
+            merged.sum += histogram['sum']
+    return {
+        'started_at': min((snapshot['started_at'] for snapshot in snapshots), default=time.time()),
+        'exported_at': time.time(),
+        'counters': [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in sorted(counters.items())
+        ],
+        'histograms': [
+            {'name': name, 'labels': dict(labels), **histogram.to_dict()}
+            for (name, labels), histogram in sorted(histograms.items())
+        ],
+    }
+
+
+def _write_atomic(path, text):
+    # A unique temp name, so concurrent writers never rename each other's file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        # mkstemp creates files readable only by us; keep the usual mode
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _prometheus_labels(labels, extra=None):
+    items = list(labels.items()) + list((extra or {}).items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in items) + '}'
+
+
+def format_prometheus(snapshot):
+    """Render a snapshot in the Prometheus text exposition format"""
+    lines = []
+    typed = set()
+
+    def header(name, kind):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# HELP {METRIC_PREFIX}{name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {METRIC_PREFIX}{name} {kind}")
+
+    for counter in snapshot['counters']:
+        header(counter['name'], 'counter')
+        lines.append(f"{METRIC_PREFIX}{counter['name']}{_prometheus_labels(counter['labels'])} {counter['value']}")
+
+    for histogram in snapshot['histograms']:
+        name = histogram['name']
+        header(name, 'histogram')
+        cumulative = 0
+        bounds = [str(bound) for bound in histogram['buckets']] + ['+Inf']
+        for bound, count in zip(bounds, histogram['counts']):
+            cumulative += count
+            labels = _prometheus_labels(histogram['labels'], {'le': bound})
+            lines.append(f"{METRIC_PREFIX}{name}_bucket{labels} {cumulative}")
+        labels = _prometheus_labels(histogram['labels'])
+        lines.append(f"{METRIC_PREFIX}{name}_sum{labels} {histogram['sum']}")
+        lines.append(f"{METRIC_PREFIX}{name}_count{labels} {histogram['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+class JsonExporter:
+    """Write each snapshot to a JSON file, replacing the previous one"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, snapshot):
+        _write_atomic(self.path, json.dumps(snapshot, indent=2))
+
+
+class PrometheusExporter:
+    """Write each snapshot in Prometheus text format, e.g. for node_exporter's textfile collector"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, snapshot):
+        _write_atomic(self.path, format_prometheus(snapshot))
+
+
+EXPORTERS = {
+    'json': JsonExporter,
+    'prometheus': PrometheusExporter,
+}
+
+
+def make_exporter(kind, path):
+    """Exporter for a kind listed in EXPORTERS"""
+    if kind not in EXPORTERS:
+        raise ValueError(f"Unknown metrics exporter '{kind}', expected one of {sorted(EXPORTERS)}")
+    return EXPORTERS[kind](path)
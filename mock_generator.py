@@ -0,0 +1,129 @@
+import itertools
+
+import numpy as np
+
+from product_schema import FLAGS, ColumnBatch
+
+# Flags create_mock_data always sets; every other flag is a fair coin flip
+ALWAYS_TRUE_FLAGS = ['is_available', 'is_cash_on_delivery', 'is_online_payment']
+
+
+def _cycle_jobs(jobs):
+    """Endless job stream over repeated passes of jobs (see MockDataGenerator.generate)"""
+    if not callable(jobs):
+        jobs_list = list(jobs)
+        jobs = lambda: iter(jobs_list)
+    while True:
+        passed = False
+        for job in jobs():
+            passed = True
+            yield job
+        if not passed:
+            raise ValueError("MockDataGenerator.generate needs at least one job")
+
+
+def _slug(subcategory):
+    return subcategory.lower().replace(' ', '_')
+
+
+def _format(prefix, numbers, suffix=''):
+    """Vectorized f"{prefix}{n}{suffix}" over an integer array"""
+    text = np.char.add(prefix, numbers.astype(str))
+    return np.char.add(text, suffix) if suffix else text
+
+
+class MockDataGenerator:
+    """Seeded, vectorized generator of mock products for load testing
+
+    Produces the same columns and value distributions as
+    SimpleEdgeBlinkItScraper.create_mock_data, but a whole chunk of jobs at a
+    time with NumPy, as ColumnBatches any output sink accepts.
+    """
+
+    def __init__(self, seed=None, min_products=5, max_products=10):
+        self.rng = np.random.default_rng(seed)
+        self.min_products = min_products
+        self.max_products = max_products
+        self._always_true = FLAGS.mask(ALWAYS_TRUE_FLAGS)
+        # Bits past the last flag in the final byte stay clear
+        self._valid = FLAGS.mask(FLAGS.names)
+
+    def _random_flags(self, n):
+        flags = self.rng.integers(0, 256, size=(n, FLAGS.nbytes), dtype=np.uint8)
+        return (flags | self._always_true) & self._valid
+
+    def _price_like(self, low, high, n, decimals):
+        return np.round(self.rng.uniform(low, high, n), decimals)
+
+    def _integers(self, low, high, n):
+        """Integers in [low, high], inclusive like random.randint"""
+        return self.rng.integers(low, high + 1, n)
+
+    def _sometimes(self, values, default, n):
+        """values where a coin flip comes up heads, default elsewhere"""
+        return np.where(self.rng.random(n) < 0.5, values, default)
+
+    def generate_jobs(self, jobs):
+        """Generate one ColumnBatch covering a list of jobs"""
+        n_jobs = len(jobs)
+        counts = self._integers(self.min_products, self.max_products, n_jobs)
+        n = int(counts.sum())
+        # Position of each row within its own job, like `i` in create_mock_data
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        i = np.arange(n) - starts
+        job_index = np.repeat(np.arange(n_jobs), counts)
+
+        subcategories = np.array([job['subcategory'] for job in jobs])[job_index]
+        slugs = np.array([_slug(job['subcategory']) for job in jobs])[job_index]
+        number = i + 1
+
+        columns = {
+            'latitude': np.array([job['lat'] for job in jobs], dtype=np.float64)[job_index],
+            'longitude': np.array([job['lng'] for job in jobs], dtype=np.float64)[job_index],
+            'category': np.array([job['category'] for job in jobs])[job_index],
+            'subcategory': subcategories,
+            'product_id': np.char.add(np.char.add(slugs, '_'), i.astype(str)),
+            'product_name': np.char.add(np.char.add(subcategories, ' Product '), number.astype(str)),
+            'brand': _format('Brand ', number),
+            'price': self._price_like(50, 500, n, 2),
+            'original_price': self._price_like(60, 600, n, 2),
+            'discount_percentage': self._integers(5, 30, n),
+            'rating': self._price_like(3.0, 5.0, n, 1),
+            'review_count': self._integers(10, 500, n),
+            'availability': np.full(n, 'In Stock'),
+            'image_url': _format('https://example.com/image_', i, '.jpg'),
+            'description': np.char.add(np.char.add('This is a ', subcategories), ' product'),
+            'weight': _format('', self._integers(100, 1000, n), 'g'),
+            'unit': np.full(n, 'g'),
+            'stock_quantity': self._integers(10, 100, n),
+            'seller_name': _format('Seller ', number),
+            'seller_rating': self._price_like(3.0, 5.0, n, 1),
+            'delivery_time': _format('', self._integers(10, 60, n), ' minutes'),
+            'delivery_charge': self._integers(0, 50, n),
+            'min_order_amount': self._integers(100, 500, n),
+            'instant_discount_amount': self._sometimes(self._integers(10, 100, n), 0, n),
+            'coupon_code': self._sometimes(_format('SAVE', number), '', n),
+            'coupon_discount': self._sometimes(self._integers(5, 20, n), 0, n),
+            'flags': self._random_flags(n),
+            'flags_known': np.tile(self._valid, (n, 1)),
+        }
+        return ColumnBatch({}, columns, source='mock')
+
+    def generate(self, jobs, total_rows, chunk_jobs=10000):
+        """Yield batches until total_rows products exist, cycling through jobs
+
+        jobs is a list, or a callable returning a fresh job iterator for
+        every pass (e.g. re-opening a job file), so a large job stream is
+        never held in memory; any other iterable is read into a list first.
+        Only `chunk_jobs` jobs worth of rows (~75k by default) are in memory
+        at once, so row counts in the tens of millions stay bounded.
+        """
+        jobs = _cycle_jobs(jobs)
+        produced = 0
+        while produced < total_rows:
+            chunk = list(itertools.islice(jobs, chunk_jobs))
+            batch = self.generate_jobs(chunk)
+            if produced + len(batch) > total_rows:
+                batch = batch.take(np.arange(total_rows - produced))
+            produced += len(batch)
+            yield batch
@@ -0,0 +1,314 @@
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from product_schema import DIETARY_FLAGS
+
+SEARCH_PREFIX = '/api/v4/search/'
+LOCATION_PATH = '/api/v4/location/validate'
+
+# Containers the scraper's find_product_list understands
+RESPONSE_SHAPES = ('products', 'data.products', 'results')
+
+# Status codes injected errors are drawn from, uniformly
+ERROR_CODES = (404, 429, 500, 503)
+
+
+def _job_seed(*parts):
+    """Stable seed so every page of a job describes the same products"""
+    digest = hashlib.blake2b('|'.join(parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+class MockBlinkitConfig:
+    """Behaviour of the stand-in API, shared by all request handler threads"""
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, error_codes=ERROR_CODES,
+                 products=120, max_products=None, description_bytes=40, shape='data.products',
+                 include_total=True, working_paths=None, retry_after=1, max_rps=None, seed=0):
+        # Seconds added to every response, plus up to `jitter` more at random
+        self.latency = latency
+        self.jitter = jitter
+        # Fraction of requests answered with one of error_codes instead
+        self.error_rate = error_rate
+        self.error_codes = error_codes
+        # Products per job: exactly `products`, or uniform up to max_products
+        self.products = products
+        self.max_products = max_products
+        # Padding in each product's description, to scale payload size
+        self.description_bytes = description_bytes
+        self.shape = shape
+        self.include_total = include_total
+        # Search paths (e.g. 'product') that return data; others answer 404.
+        # None serves data on every path under /api/v4/search/
+        self.working_paths = working_paths
+        # Retry-After seconds sent with 429 responses
+        self.retry_after = retry_after
+        # Requests/sec served before answering 429, like a real rate limit
+        self.max_rps = max_rps
+        self.seed = seed
+
+
+class MockBlinkitHandler(BaseHTTPRequestHandler):
+    """Serves location validation and paginated search responses"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _injected_error(self):
+        """Send a random error response if this request draws one"""
+        config = self.config
+        if config.error_rate <= 0 or random.random() >= config.error_rate:
+            return False
+        status = random.choice(config.error_codes)
+        headers = {'Retry-After': str(config.retry_after)} if status == 429 else None
+        self._send_json(status, {'error': f"injected {status}"}, headers)
+        self.server.count('errors')
+        return True
+
+    def do_GET(self):
+        config = self.config
+        url = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.count('requests')
+
+        delay = config.latency + (random.uniform(0, config.jitter) if config.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+        if not self.server.admit():
+            self._send_json(429, {'error': 'rate limited'}, {'Retry-After': str(config.retry_after)})
+            self.server.count('throttled')
+            return
+        if self._injected_error():
+            return
+
+        if url.path == LOCATION_PATH:
+            self._send_json(200, {
+                'serviceable': True,
+                'lat': query.get('lat'),
+                'lng': query.get('lng'),
+                'pincode': query.get('pincode'),
+            })
+        elif url.path.startswith(SEARCH_PREFIX):
+            self._search(url.path[len(SEARCH_PREFIX):], query)
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def _search(self, path, query):
+        config = self.config
+        if config.working_paths is not None and path not in config.working_paths:
+            self._send_json(404, {'error': 'not found'})
+            return
+        term = query.get('q') or query.get('query') or query.get('search')
+        lat = query.get('lat') or query.get('latitude')
+        lng = query.get('lng') or query.get('longitude')
+        if not term or lat is None or lng is None:
+            self._send_json(400, {'error': 'missing search parameters'})
+            return
+
+        if 'offset' in query:
+            size = int(query.get('limit', 50))
+            start = int(query['offset'])
+        else:
+            size = int(query.get('size', 50))
+            start = (int(query.get('page', 1)) - 1) * size
+
+        rng = random.Random(_job_seed(str(config.seed), term, lat, lng))
+        total = config.products
+        if config.max_products is not None:
+            total = rng.randint(config.products, config.max_products)
+        products = [self._product(term, i) for i in range(start, min(start + size, total))]
+        self.server.count('products', len(products))
+
+        response = {'products': products}
+        if config.shape == 'data.products':
+            response = {'data': response}
+        elif config.shape == 'results':
+            response = {'results': products}
+        if config.include_total:
+            response['total'] = total
+        self._send_json(200, response)
+
+    def _product(self, term, i):
+        """One product with every field extract_product_data reads"""
+        rng = random.Random(_job_seed(str(self.config.seed), term, str(i)))
+        product = {
+            'id': f"{term.lower().replace(' ', '_')}_{i}",
+            'name': f"{term} Product {i + 1}",
+            'brand': f"Brand {i % 25 + 1}",
+            'price': round(rng.uniform(50, 500), 2),
+            'original_price': round(rng.uniform(60, 600), 2),
+            'discount_percentage': rng.randint(5, 30),
+            'rating': round(rng.uniform(3.0, 5.0), 1),
+            'review_count': rng.randint(10, 500),
+            'availability': 'In Stock',
+            'image_url': f"https://example.com/image_{i}.jpg",
+            'description': f"This is a {term} product. " + 'x' * self.config.description_bytes,
+            'weight': f"{rng.randint(100, 1000)}g",
+            'unit': 'g',
+            'is_veg': rng.random() < 0.5,
+            'is_available': True,
+            'stock_quantity': rng.randint(10, 100),
+            'seller_name': f"Seller {i % 10 + 1}",
+            'seller_rating': round(rng.uniform(3.0, 5.0), 1),
+            'delivery_time': f"{rng.randint(10, 60)} minutes",
+            'delivery_charge': rng.randint(0, 50),
+            'min_order_amount': rng.randint(100, 500),
+            'is_express_delivery': rng.random() < 0.5,
+            'is_free_delivery': rng.random() < 0.5,
+            'is_cash_on_delivery': True,
+            'is_online_payment': True,
+            'is_bestseller': rng.random() < 0.1,
+            'is_new': rng.random() < 0.1,
+        }
+        for flag in DIETARY_FLAGS:
+            product[flag] = rng.random() < 0.5
+        return product
+
+
+class MockBlinkitServer(ThreadingHTTPServer):
+    """Local stand-in for the BlinkIt API, for benchmarks and offline runs
+
+    Serves /api/v4/location/validate and the /api/v4/search/* family on a
+    background thread. Pass `url` as the scraper's base_url.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        super().__init__((host, port), MockBlinkitHandler)
+        self.config = config or MockBlinkitConfig()
+        self.counters = {'requests': 0, 'errors': 0, 'throttled': 0, 'products': 0}
+        self._counter_lock = threading.Lock()
+        self._tokens = self.config.max_rps
+        self._refilled = time.monotonic()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name, n=1):
+        with self._counter_lock:
+            self.counters[name] += n
+
+    def admit(self):
+        """Take a token from the server-wide rate limit, False if none is left"""
+        max_rps = self.config.max_rps
+        if max_rps is None:
+            return True
+        with self._counter_lock:
+            now = time.monotonic()
+            self._tokens = min(max_rps, self._tokens + (now - self._refilled) * max_rps)
+            self._refilled = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def config_from_args(args):
+    return MockBlinkitConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_codes=tuple(args.error_codes),
+        products=args.products,
+        max_products=args.max_products,
+        description_bytes=args.description_bytes,
+        shape=args.shape,
+        include_total=not args.no_total,
+        working_paths=args.working_paths,
+        retry_after=args.retry_after,
+        max_rps=args.max_rps,
+        seed=args.seed
+    )
+
+
+def add_server_arguments(parser):
+    """Server behaviour options, shared with benchmark.py"""
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.01,
+                        help="Up to this many extra seconds of random latency")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Fraction of requests answered with an error status")
+    parser.add_argument('--error-codes', type=int, nargs='+', default=list(ERROR_CODES),
+                        help="Status codes used for injected errors")
+    parser.add_argument('--products', type=int, default=120,
+                        help="Products per job (the minimum when --max-products is set)")
+    parser.add_argument('--max-products', type=int, default=None,
+                        help="Vary products per job up to this many")
+    parser.add_argument('--description-bytes', type=int, default=40,
+                        help="Padding added to every description to scale payload size")
+    parser.add_argument('--shape', choices=RESPONSE_SHAPES, default='data.products',
+                        help="Where the product array sits in search responses")
+    parser.add_argument('--no-total', action='store_true',
+                        help="Do not advertise the total product count")
+    parser.add_argument('--working-paths', nargs='+', default=None,
+                        help="Search paths that return data, e.g. product_suggestions; others answer 404")
+    parser.add_argument('--retry-after', type=int, default=1,
+                        help="Retry-After seconds sent with 429 responses")
+    parser.add_argument('--max-rps', type=float, default=None,
+                        help="Answer 429 once more than this many requests/sec arrive")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed for generated product data")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the BlinkIt API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockBlinkitServer(config_from_args(args), args.host, args.port)
+    print(f"Serving mock BlinkIt API on {server.url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {server.counters}")
+
+
+if __name__ == "__main__":
+    main()
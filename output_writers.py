@@ -0,0 +1,552 @@
+import csv
+import json
+import os
+import shutil
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+    pq = None
+
+from delta_output import DELTA_COLUMNS, CHANGE_TYPES, DeltaTracker, plain
+import pandas as pd
+
+from product_schema import (
+    FIELD_KINDS, FLAGS, OFFER_TABLE_COLUMNS, PACKED_FLAG_COLUMNS, PRODUCT_TABLE_COLUMNS, ProductInterner,
+    batches_to_columns, batches_to_frame, output_columns,
+)
+
+
+class OutputSink:
+    """Writer that receives ColumnBatches as jobs finish and flushes them in batches
+
+    Rows go to `<path>.part` and the file is renamed to `path` only when the
+    sink is closed cleanly, so readers never see a half-written output and a
+    crash leaves everything flushed so far in the .part file.
+    """
+
+    # Whether rows are durable on disk as soon as flush() returns
+    durable_flush = True
+
+    # Whether empty batches are kept; an empty job result can still mean something
+    keep_empty_batches = False
+
+    def __init__(self, path, batch_size=5000, flush_interval=30.0, expand_flags=True, append=False):
+        self.path = path
+        # Keep the rows of an earlier run of the same output (used by --resume)
+        self.append = append
+        self.part_path = f"{path}.part"
+        # Flush once this many rows are buffered or this many seconds have passed
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.expand_flags = expand_flags
+        self.rows_written = 0
+        self._pending = []
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+        self._closed = False
+
+    @property
+    def columns(self):
+        return output_columns(self.expand_flags)
+
+    def write(self, batch):
+        """Buffer a batch, flushing if the flush policy says so; returns True if flushed"""
+        if len(batch) or self.keep_empty_batches:
+            self._pending.append(batch)
+            self._pending_rows += len(batch)
+        if (self._pending_rows >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        if self._pending:
+            self._write_batches(self._pending)
+            self.rows_written += self._pending_rows
+        self._pending = []
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Flush remaining rows and atomically move the output into place"""
+        if self._closed:
+            return
+        self.flush()
+        self._finalize()
+        os.replace(self.part_path, self.path)
+        self._closed = True
+
+    def abort(self):
+        """Flush what we have but leave it in the .part file"""
+        if self._closed:
+            return
+        self.flush()
+        self._finalize()
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def _write_batches(self, batches):
+        raise NotImplementedError
+
+    def _finalize(self):
+        pass
+
+
+def _open_csv_part(path, part_path, append, columns):
+    """Open part_path for writing; returns (file, whether a header is already there)
+
+    Appending checks that an existing header matches columns, so rows are
+    never added under a different column layout.
+    """
+    mode = 'w'
+    if append:
+        if not os.path.exists(part_path) and os.path.exists(path):
+            shutil.copyfile(path, part_path)
+        if os.path.exists(part_path):
+            # Continue an interrupted .part file, or one seeded from the
+            # finished output of an earlier run
+            mode = 'a'
+            with open(part_path, newline='', encoding='utf-8') as f:
+                header = next(csv.reader(f), None)
+            if header is not None and header != list(columns):
+                raise ValueError(f"Cannot append to {path}: its columns differ from the current output settings")
+    f = open(part_path, mode, newline='', encoding='utf-8')
+    return f, mode == 'a' and os.path.getsize(part_path) > 0
+
+
+def _write_csv(f, frame, header):
+    frame.to_csv(f, header=header, index=False)
+    f.flush()
+    os.fsync(f.fileno())
+
+
+class CsvSink(OutputSink):
+    """Stream batches to a CSV file"""
+
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        self._file, self._header_written = _open_csv_part(self.path, self.part_path, self.append, self.columns)
+
+    def _write_batches(self, batches):
+        _write_csv(self._file, batches_to_frame(batches, self.expand_flags), not self._header_written)
+        self._header_written = True
+
+    def _finalize(self):
+        if not self._header_written:
+            # Keep the output well-formed even when nothing was scraped
+            batches_to_frame([], self.expand_flags).to_csv(self._file, index=False)
+            self._header_written = True
+        self._file.close()
+
+
+# Low-cardinality string columns that are dictionary-encoded in memory
+DICTIONARY_COLUMNS = [
+    'category', 'subcategory', 'brand', 'seller_name', 'availability',
+    'unit', 'delivery_time', 'coupon_code',
+]
+
+# Columns Parquet should dictionary-encode on disk (includes the coordinates,
+# which repeat for every product of a location)
+PARQUET_DICTIONARY_COLUMNS = DICTIONARY_COLUMNS + ['latitude', 'longitude']
+
+
+def _arrow_type(name):
+    if name in PACKED_FLAG_COLUMNS:
+        return pa.binary(FLAGS.nbytes)
+    if name in ('latitude', 'longitude'):
+        # float32 would lose ~1m of precision, so coordinates stay float64
+        return pa.float64()
+    kind = FIELD_KINDS[name]
+    if kind == 'float':
+        return pa.float32()
+    if kind == 'int':
+        return pa.int32()
+    if kind == 'bool':
+        return pa.bool_()
+    if name in DICTIONARY_COLUMNS:
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.string()
+
+
+def arrow_schema(expand_flags=True):
+    """Typed Arrow schema for the product output columns"""
+    if pa is None:
+        raise ImportError("Parquet output requires pyarrow (pip install pyarrow)")
+    return pa.schema([pa.field(name, _arrow_type(name)) for name in output_columns(expand_flags)])
+
+
+def _coerce(value, kind):
+    """Best-effort conversion of a loosely typed API value to the schema kind"""
+    if value is None:
+        return None
+    try:
+        if kind == 'float':
+            return float(value)
+        if kind == 'int':
+            return int(float(value))
+        if kind == 'bool':
+            if isinstance(value, str):
+                return value.strip().lower() in ('true', '1', 'yes', 'y')
+            return bool(value)
+        return value if isinstance(value, str) else str(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _arrow_array(values, field):
+    arrow_type = field.type
+    value_type = arrow_type.value_type if pa.types.is_dictionary(arrow_type) else arrow_type
+    try:
+        array = pa.array(values, type=value_type, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+        kind = FIELD_KINDS.get(field.name)
+        array = pa.array([_coerce(value, kind) for value in values], type=value_type)
+    if pa.types.is_dictionary(arrow_type):
+        array = array.dictionary_encode()
+    return array
+
+
+class ParquetSink(OutputSink):
+    """Stream batches to a Parquet file, one row group per flush"""
+
+    # A Parquet file is unreadable until its footer is written on close
+    durable_flush = False
+
+    def __init__(self, path, compression='zstd', **kwargs):
+        super().__init__(path, **kwargs)
+        self.schema = arrow_schema(self.expand_flags)
+        self._writer = pq.ParquetWriter(
+            self.part_path,
+            self.schema,
+            compression=compression,
+            use_dictionary=[name for name in PARQUET_DICTIONARY_COLUMNS if name in self.schema.names],
+        )
+        if self.append and os.path.exists(self.path):
+            self._copy_existing()
+
+    def _copy_existing(self):
+        """Carry the row groups of the existing output over into the new file"""
+        existing = pq.ParquetFile(self.path)
+        if not existing.schema_arrow.equals(self.schema):
+            raise ValueError(f"Cannot append to {self.path}: its schema differs from the current output settings")
+        for i in range(existing.num_row_groups):
+            self._writer.write_table(existing.read_row_group(i))
+
+    def _to_table(self, batches):
+        data = batches_to_columns(batches, self.expand_flags, packed_hex=False)
+        arrays = [_arrow_array(data[field.name], field) for field in self.schema]
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def _write_batches(self, batches):
+        table = self._to_table(batches)
+        self._writer.write_table(table, row_group_size=max(len(table), 1))
+
+    def _finalize(self):
+        self._writer.close()
+
+
+class DeltaSink(OutputSink):
+    """Write only what changed since the last scrape, as JSON Lines change records
+
+    Each flush diffs the buffered batches against the DeltaTracker state,
+    appends the new/changed/removed records and fsyncs them, and only then
+    commits the new fingerprints. Mock-data batches are skipped so generated
+    products never show up as changes; empty batches are kept, as a job that
+    now returns nothing has had all its products removed.
+    """
+
+    keep_empty_batches = True
+
+    def __init__(self, path, state_path='delta_state.sqlite', **kwargs):
+        super().__init__(path, **kwargs)
+        self.tracker = DeltaTracker(state_path)
+        self.change_counts = dict.fromkeys(CHANGE_TYPES, 0)
+        mode = 'w'
+        if self.append:
+            if not os.path.exists(self.part_path) and os.path.exists(self.path):
+                shutil.copyfile(self.path, self.part_path)
+            if os.path.exists(self.part_path):
+                mode = 'a'
+        self._file = open(self.part_path, mode, encoding='utf-8')
+
+    @property
+    def columns(self):
+        return DELTA_COLUMNS
+
+    def _write_batches(self, batches):
+        lines = []
+        for batch in batches:
+            if batch.source == 'mock':
+                continue
+            for record in self.tracker.diff(batch):
+                self.change_counts[record['change']] += 1
+                lines.append(json.dumps(record, default=plain))
+        if lines:
+            self._file.write('\n'.join(lines) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self.tracker.commit()
+
+    def _finalize(self):
+        self._file.close()
+        self.tracker.close()
+
+
+def products_path(path):
+    """Product table written next to a normalized offers file: out.csv -> out_products.csv"""
+    root, ext = os.path.splitext(path)
+    return f"{root}_products{ext}"
+
+
+class NormalizedSink(OutputSink):
+    """Split products into a product table and a per-location offer table, both CSV
+
+    `path` receives the offers (OFFER_TABLE_COLUMNS: job context, product_id,
+    price, availability, delivery and other per-location fields) and
+    products_path(path) one row per product_id with its static attributes
+    (PRODUCT_TABLE_COLUMNS). The ProductInterner decides which batch carries
+    a product's attributes; pass the one the scrapers extract with, or
+    batches arriving without first_seen (mock, synthetic, replayed) are
+    interned here. Appending seeds the interner from the existing product
+    table so a resumed run does not repeat products.
+    """
+
+    def __init__(self, path, interner=None, **kwargs):
+        super().__init__(path, **kwargs)
+        if not self.expand_flags:
+            raise ValueError("Normalized output always writes expanded flag columns")
+        self.interner = interner if interner is not None else ProductInterner()
+        self.products_path = products_path(path)
+        self.products_part_path = f"{self.products_path}.part"
+        self.products_written = 0
+        self._products_file, self._products_header = _open_csv_part(
+            self.products_path, self.products_part_path, self.append, PRODUCT_TABLE_COLUMNS
+        )
+        if self._products_header:
+            existing = pd.read_csv(self.products_part_path, usecols=['product_id'], dtype=str)['product_id']
+            self.interner.claim(existing.dropna().tolist())
+        self._file, self._header_written = _open_csv_part(self.path, self.part_path, self.append, self.columns)
+
+    @property
+    def columns(self):
+        return OFFER_TABLE_COLUMNS
+
+    def _write_batches(self, batches):
+        products = []
+        for batch in batches:
+            first_seen = batch.first_seen
+            if first_seen is None:
+                first_seen = self.interner.claim(batch.columns['product_id'])
+            if first_seen.any():
+                products.append(batch.take(first_seen))
+        # Products first, so an offer on disk always has its product row
+        if products:
+            data = batches_to_columns(products)
+            frame = pd.DataFrame({name: data[name] for name in PRODUCT_TABLE_COLUMNS},
+                                 columns=PRODUCT_TABLE_COLUMNS)
+            _write_csv(self._products_file, frame, not self._products_header)
+            self._products_header = True
+            self.products_written += len(frame)
+        data = batches_to_columns(batches)
+        frame = pd.DataFrame({name: data[name] for name in OFFER_TABLE_COLUMNS}, columns=OFFER_TABLE_COLUMNS)
+        _write_csv(self._file, frame, not self._header_written)
+        self._header_written = True
+
+    def close(self):
+        if self._closed:
+            return
+        super().close()
+        os.replace(self.products_part_path, self.products_path)
+
+    def _finalize(self):
+        # Keep both files well-formed even when nothing was scraped
+        if not self._products_header:
+            pd.DataFrame(columns=PRODUCT_TABLE_COLUMNS).to_csv(self._products_file, index=False)
+            self._products_header = True
+        if not self._header_written:
+            pd.DataFrame(columns=OFFER_TABLE_COLUMNS).to_csv(self._file, index=False)
+            self._header_written = True
+        self._products_file.close()
+        self._file.close()
+
+
+SINKS = {
+    'csv': CsvSink,
+    'parquet': ParquetSink,
+    'delta': DeltaSink,
+    'normalized': NormalizedSink,
+}
+
+# File extension used for each format's default output name
+EXTENSIONS = {
+    'csv': 'csv',
+    'parquet': 'parquet',
+    'delta': 'jsonl',
+    'normalized': 'csv',
+}
+
+
+def make_sink(output_format, path, **kwargs):
+    """Create the output sink for a format name ('csv', 'parquet', 'delta' or 'normalized')"""
+    return SINKS[output_format](path, **kwargs)
+
+
+# Rows read at a time when filtering a shard during a merge
+MERGE_CHUNK_ROWS = 50000
+
+
+def _job_keys(frame):
+    """checkpoint.job_key of every row of a frame with the context columns"""
+    return (frame['latitude'].astype(float).map('{:.6f}'.format) + '|'
+            + frame['longitude'].astype(float).map('{:.6f}'.format) + '|'
+            + frame['category'].astype(str) + '|' + frame['subcategory'].astype(str))
+
+
+def _copy_csv_rows(path, out, header, select):
+    """Append the rows of a CSV file for which select(chunk) is True; returns the header"""
+    with open(path, newline='', encoding='utf-8') as f:
+        first = f.readline()
+    if not first:
+        return header
+    if header is None:
+        header = first
+        out.write(header)
+    elif first != header:
+        raise ValueError(f"Cannot merge {path}: its columns differ from the other shards")
+    # Values are kept as the exact strings the file holds
+    for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=MERGE_CHUNK_ROWS):
+        chunk[select(chunk).to_numpy()].to_csv(out, header=False, index=False)
+    return header
+
+
+def _merge_csv(paths, part_path, keep=None):
+    header = None
+    with open(part_path, 'w', newline='', encoding='utf-8') as out:
+        for path in paths:
+            if keep is not None:
+                jobs = keep[path]
+                header = _copy_csv_rows(path, out, header, lambda chunk: _job_keys(chunk).isin(jobs))
+                continue
+            with open(path, newline='', encoding='utf-8') as f:
+                first = f.readline()
+                if not first:
+                    continue
+                if header is None:
+                    header = first
+                    out.write(header)
+                elif first != header:
+                    raise ValueError(f"Cannot merge {path}: its columns differ from the other shards")
+                shutil.copyfileobj(f, out)
+
+
+def _merge_parquet(paths, part_path, keep=None):
+    writer = None
+    try:
+        for path in paths:
+            shard = pq.ParquetFile(path)
+            if writer is None:
+                writer = pq.ParquetWriter(part_path, shard.schema_arrow, compression='zstd')
+            elif not shard.schema_arrow.equals(writer.schema):
+                raise ValueError(f"Cannot merge {path}: its schema differs from the other shards")
+            for i in range(shard.num_row_groups):
+                table = shard.read_row_group(i)
+                if keep is not None:
+                    context = table.select(['latitude', 'longitude', 'category', 'subcategory']).to_pandas()
+                    table = table.filter(pa.array(_job_keys(context).isin(keep[path]).to_numpy()))
+                writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def merge_outputs(paths, output_format, path, keep=None):
+    """Concatenate output shards of one format into path, atomically like the sinks
+
+    keep optionally maps each shard path to the job keys whose rows to take
+    from it, so a job that ran on two workers is merged once. Only 'csv' and
+    'parquet' shards can be merged.
+    """
+    if not paths:
+        raise ValueError("No output shards to merge")
+    part_path = f"{path}.part"
+    if output_format == 'csv':
+        _merge_csv(paths, part_path, keep)
+    elif output_format == 'parquet':
+        _merge_parquet(paths, part_path, keep)
+    else:
+        raise ValueError(f"Cannot merge '{output_format}' output shards")
+    os.replace(part_path, path)
+
+
+def _filter_csv(path, select):
+    """Rewrite a CSV file in place, keeping the rows for which select(chunk) is True"""
+    tmp_path = f"{path}.filtered"
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as out:
+        _copy_csv_rows(path, out, None, select)
+    os.replace(tmp_path, path)
+
+
+def _filter_parquet(path, select):
+    tmp_path = f"{path}.filtered"
+    existing = pq.ParquetFile(path)
+    schema = existing.schema_arrow
+    writer = pq.ParquetWriter(
+        tmp_path, schema, compression='zstd',
+        use_dictionary=[name for name in PARQUET_DICTIONARY_COLUMNS if name in schema.names],
+    )
+    try:
+        for i in range(existing.num_row_groups):
+            table = existing.read_row_group(i)
+            context = table.select(['latitude', 'longitude', 'category', 'subcategory']).to_pandas()
+            writer.write_table(table.filter(pa.array(select(context).to_numpy())))
+    finally:
+        writer.close()
+    os.replace(tmp_path, path)
+
+
+def drop_jobs(path, output_format, jobs):
+    """Remove the rows of the given job keys from an output that is about to be resumed
+
+    Used so jobs answered with mock data can be retried without their mock
+    rows staying behind. CSV outputs are filtered in their .part file when
+    an interrupted run left one, Parquet outputs in the finished file (a
+    Parquet .part is unreadable). Normalized output also drops product rows
+    no remaining offer refers to. Delta output never holds mock rows.
+    """
+    if not jobs or output_format == 'delta':
+        return
+    part_path = f"{path}.part"
+    source = part_path if output_format != 'parquet' and os.path.exists(part_path) else path
+    if not os.path.exists(source):
+        return
+    drop = lambda frame: ~_job_keys(frame).isin(jobs)
+    if output_format == 'parquet':
+        _filter_parquet(source, drop)
+        return
+    _filter_csv(source, drop)
+    if output_format != 'normalized':
+        return
+    products = f"{products_path(path)}.part"
+    if not os.path.exists(products):
+        products = products_path(path)
+        if not os.path.exists(products):
+            return
+    referenced = set()
+    for chunk in pd.read_csv(source, usecols=['product_id'], dtype=str, keep_default_na=False,
+                             chunksize=MERGE_CHUNK_ROWS):
+        referenced.update(chunk['product_id'])
+    _filter_csv(products, lambda chunk: chunk['product_id'].isin(referenced))
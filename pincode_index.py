@@ -0,0 +1,164 @@
+import csv
+import math
+
+import numpy as np
+
+# Fallback centroids used when no pincode table is supplied
+DEFAULT_CENTROIDS = [
+    ("110001", 28.6139, 77.2090),  # Delhi
+    ("400001", 19.0760, 72.8777),  # Mumbai
+    ("560001", 12.9716, 77.5946),  # Bangalore
+    ("700001", 22.5726, 88.3639),  # Kolkata
+    ("500001", 17.3850, 78.4867),  # Hyderabad
+]
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Column names accepted for each field of a pincode centroid CSV
+PINCODE_COLUMNS = ('pincode', 'pin', 'postal_code')
+LATITUDE_COLUMNS = ('latitude', 'lat')
+LONGITUDE_COLUMNS = ('longitude', 'lng', 'lon', 'long')
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance in km; accepts NumPy arrays and broadcasts"""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _pick_column(fieldnames, options):
+    lowered = {name.strip().lower(): name for name in fieldnames}
+    for option in options:
+        if option in lowered:
+            return lowered[option]
+    raise ValueError(f"Pincode CSV needs one of the columns {options}, got {fieldnames}")
+
+
+class PincodeIndex:
+    """Grid-bucketed nearest-centroid lookup from coordinates to pincodes"""
+
+    # Square rings up to this many cells are scanned bucket by bucket; larger
+    # searches fall back to a vectorized scan of every centroid's cell
+    MAX_BUCKET_RING = 3
+    # Queries are compared against candidates in chunks of this many rows
+    QUERY_CHUNK = 4096
+
+    def __init__(self, centroids, cell_size=0.25, max_distance_km=25.0):
+        centroids = list(centroids)
+        if not centroids:
+            raise ValueError("PincodeIndex needs at least one centroid")
+        pincodes, lats, lngs = zip(*centroids)
+        self.pincodes = np.array(pincodes, dtype=object)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.cell_size = cell_size
+        # Matches further away than this are reported as suspect
+        self.max_distance_km = max_distance_km
+
+        self._rows = np.floor(self.lats / cell_size).astype(np.int64)
+        self._cols = np.floor(self.lngs / cell_size).astype(np.int64)
+        buckets = {}
+        for i, cell in enumerate(zip(self._rows.tolist(), self._cols.tolist())):
+            buckets.setdefault(cell, []).append(i)
+        self._buckets = {cell: np.array(ids, dtype=np.int64) for cell, ids in buckets.items()}
+
+    @classmethod
+    def from_csv(cls, path, **kwargs):
+        """Build an index from a CSV of pincode, latitude, longitude rows
+
+        Rows sharing a pincode (e.g. one per post office) are averaged into a
+        single centroid.
+        """
+        sums = {}
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            pincode_col = _pick_column(reader.fieldnames, PINCODE_COLUMNS)
+            lat_col = _pick_column(reader.fieldnames, LATITUDE_COLUMNS)
+            lng_col = _pick_column(reader.fieldnames, LONGITUDE_COLUMNS)
+            for row in reader:
+                try:
+                    lat = float(row[lat_col])
+                    lng = float(row[lng_col])
+                except (TypeError, ValueError):
+                    continue
+                if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+                    continue
+                pincode = row[pincode_col].strip()
+                total = sums.setdefault(pincode, [0.0, 0.0, 0])
+                total[0] += lat
+                total[1] += lng
+                total[2] += 1
+
+        centroids = [(pincode, lat / n, lng / n) for pincode, (lat, lng, n) in sums.items()]
+        print(f"Loaded {len(centroids)} pincode centroids from {path}")
+        return cls(centroids, **kwargs)
+
+    def _candidates(self, row, col, ring):
+        """Indices of centroids within `ring` cells of (row, col)"""
+        if ring <= self.MAX_BUCKET_RING:
+            found = [
+                self._buckets[(r, c)]
+                for r in range(row - ring, row + ring + 1)
+                for c in range(col - ring, col + ring + 1)
+                if (r, c) in self._buckets
+            ]
+            return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+        mask = (np.abs(self._rows - row) <= ring) & (np.abs(self._cols - col) <= ring)
+        return np.nonzero(mask)[0]
+
+    def _search_cell(self, row, col, q_lats, q_lngs):
+        """Exact nearest centroid for queries that all fall in cell (row, col)"""
+        ring = 1
+        while True:
+            candidates = self._candidates(row, col, ring)
+            if candidates.size:
+                distances = haversine_km(
+                    q_lats[:, None], q_lngs[:, None],
+                    self.lats[candidates][None, :], self.lngs[candidates][None, :]
+                )
+                nearest = distances.argmin(axis=1)
+                best = distances[np.arange(len(q_lats)), nearest]
+                if candidates.size == len(self.pincodes):
+                    return candidates[nearest], best
+                # Anything outside the searched square is at least `ring` cells
+                # away; longitude cells shrink towards the poles
+                edge_lat = min(89.9, (abs(row) + ring + 1) * self.cell_size)
+                safe_km = ring * self.cell_size * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+                if best.max() <= safe_km:
+                    return candidates[nearest], best
+            ring *= 2
+
+    def lookup_batch(self, lats, lngs):
+        """Resolve arrays of coordinates to (pincodes, distances_km) arrays"""
+        lats = np.asarray(lats, dtype=np.float64).ravel()
+        lngs = np.asarray(lngs, dtype=np.float64).ravel()
+        best_index = np.zeros(len(lats), dtype=np.int64)
+        best_distance = np.zeros(len(lats), dtype=np.float64)
+        if len(lats) == 0:
+            return self.pincodes[best_index], best_distance
+
+        rows = np.floor(lats / self.cell_size).astype(np.int64)
+        cols = np.floor(lngs / self.cell_size).astype(np.int64)
+        cells, inverse = np.unique(np.stack([rows, cols], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind='stable')
+        bounds = np.cumsum(np.bincount(inverse, minlength=len(cells)))
+
+        start = 0
+        for (row, col), end in zip(cells.tolist(), bounds.tolist()):
+            for chunk_start in range(start, end, self.QUERY_CHUNK):
+                query = order[chunk_start:min(end, chunk_start + self.QUERY_CHUNK)]
+                index, distance = self._search_cell(row, col, lats[query], lngs[query])
+                best_index[query] = index
+                best_distance[query] = distance
+            start = end
+
+        return self.pincodes[best_index], best_distance
+
+    def lookup(self, lat, lng):
+        """Resolve one coordinate to (pincode, distance_km)"""
+        pincodes, distances = self.lookup_batch([lat], [lng])
+        return pincodes[0], float(distances[0])
@@ -0,0 +1,504 @@
+import itertools
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Columns describing the job a product was scraped for; they are constant
+# within one response, so batches store them once instead of once per row
+CONTEXT_FIELDS = ['latitude', 'longitude', 'category', 'subcategory']
+
+# Dietary restriction flags, in output column order
+DIETARY_FLAGS = [
+    'is_gluten_free',
+    'is_dairy_free',
+    'is_nut_free',
+    'is_soy_free',
+    'is_wheat_free',
+    'is_egg_free',
+    'is_fish_free',
+    'is_shellfish_free',
+    'is_pork_free',
+    'is_beef_free',
+    'is_lamb_free',
+    'is_goat_free',
+    'is_chicken_free',
+    'is_turkey_free',
+    'is_duck_free',
+    'is_quail_free',
+    'is_rabbit_free',
+    'is_deer_free',
+    'is_bison_free',
+    'is_elk_free',
+    'is_moose_free',
+    'is_antelope_free',
+    'is_buffalo_free',
+    'is_camel_free',
+    'is_horse_free',
+    'is_donkey_free',
+    'is_mule_free',
+    'is_llama_free',
+    'is_alpaca_free',
+    'is_vicuna_free',
+    'is_guanaco_free',
+    'is_chinchilla_free',
+    'is_guinea_pig_free',
+    'is_hamster_free',
+    'is_mouse_free',
+    'is_rat_free',
+    'is_gerbil_free',
+    'is_ferret_free',
+    'is_weasel_free',
+    'is_mink_free',
+    'is_otter_free',
+    'is_badger_free',
+    'is_skunk_free',
+    'is_raccoon_free',
+    'is_coati_free',
+    'is_kinkajou_free',
+    'is_olinguito_free',
+    'is_ringtail_free',
+    'is_cacomistle_free',
+    'is_bassarisk_free',
+    'is_civet_free',
+    'is_genet_free',
+    'is_linsang_free',
+    'is_fossa_free',
+    'is_mongoose_free',
+    'is_meerkat_free',
+    'is_suricate_free',
+    'is_banded_mongoose_free',
+    'is_dwarf_mongoose_free',
+    'is_common_mongoose_free',
+    'is_white_tailed_mongoose_free',
+    'is_marsh_mongoose_free',
+    'is_bushy_tailed_mongoose_free',
+    'is_black_tipped_mongoose_free',
+    'is_selous_mongoose_free',
+    'is_meller_mongoose_free',
+    'is_egyptian_mongoose_free',
+    'is_common_slender_mongoose_free',
+    'is_black_mongoose_free',
+    'is_somalian_slender_mongoose_free',
+    'is_rufous_mongoose_free',
+    'is_cape_grey_mongoose_free',
+    'is_angolan_slender_mongoose_free',
+    'is_black_tailed_mongoose_free',
+    'is_long_nosed_mongoose_free',
+    'is_ethiopian_dwarf_mongoose_free',
+    'is_common_dwarf_mongoose_free',
+    'is_rufous_banded_mongoose_free',
+    'is_liberian_mongoose_free',
+    'is_ansorge_mongoose_free',
+    'is_flat_headed_mongoose_free',
+    'is_gambian_mongoose_free',
+    'is_sooty_mongoose_free',
+]
+
+# (output column, key in the API product object, value kind)
+PRODUCT_FIELDS = [
+    ('product_id', 'id', 'str'),
+    ('product_name', 'name', 'str'),
+    ('brand', 'brand', 'str'),
+    ('price', 'price', 'float'),
+    ('original_price', 'original_price', 'float'),
+    ('discount_percentage', 'discount_percentage', 'float'),
+    ('rating', 'rating', 'float'),
+    ('review_count', 'review_count', 'int'),
+    ('availability', 'availability', 'str'),
+    ('image_url', 'image_url', 'str'),
+    ('description', 'description', 'str'),
+    ('weight', 'weight', 'str'),
+    ('unit', 'unit', 'str'),
+    ('is_veg', 'is_veg', 'bool'),
+    ('is_available', 'is_available', 'bool'),
+    ('stock_quantity', 'stock_quantity', 'int'),
+    ('seller_name', 'seller_name', 'str'),
+    ('seller_rating', 'seller_rating', 'float'),
+    ('delivery_time', 'delivery_time', 'str'),
+    ('delivery_charge', 'delivery_charge', 'float'),
+    ('min_order_amount', 'min_order_amount', 'float'),
+    ('is_express_delivery', 'is_express_delivery', 'bool'),
+    ('is_free_delivery', 'is_free_delivery', 'bool'),
+    ('is_cash_on_delivery', 'is_cash_on_delivery', 'bool'),
+    ('is_online_payment', 'is_online_payment', 'bool'),
+    ('is_instant_discount', 'is_instant_discount', 'bool'),
+    ('instant_discount_amount', 'instant_discount_amount', 'float'),
+    ('is_coupon_available', 'is_coupon_available', 'bool'),
+    ('coupon_code', 'coupon_code', 'str'),
+    ('coupon_discount', 'coupon_discount', 'float'),
+    ('is_bestseller', 'is_bestseller', 'bool'),
+    ('is_trending', 'is_trending', 'bool'),
+    ('is_new', 'is_new', 'bool'),
+    ('is_featured', 'is_featured', 'bool'),
+    ('is_recommended', 'is_recommended', 'bool'),
+    ('is_popular', 'is_popular', 'bool'),
+    ('is_organic', 'is_organic', 'bool'),
+] + [(flag, flag, 'bool') for flag in DIETARY_FLAGS]
+
+PRODUCT_COLUMNS = [column for column, _, _ in PRODUCT_FIELDS]
+
+# Full output column order, matching the CSV header
+COLUMNS = CONTEXT_FIELDS + PRODUCT_COLUMNS
+
+# Boolean columns are stored bit-packed (see FlagRegistry) rather than one
+# Python bool per row
+FLAG_COLUMNS = [column for column, _, kind in PRODUCT_FIELDS if kind == 'bool']
+
+# Packed flag columns: set bits, and which flags had a value at all
+PACKED_FLAG_COLUMNS = ['flags', 'flags_known']
+
+# Columns a ColumnBatch actually stores
+STORED_COLUMNS = [column for column in PRODUCT_COLUMNS if column not in FLAG_COLUMNS] + PACKED_FLAG_COLUMNS
+
+# Attributes of the product itself, the same at every location it is listed
+# at; normalized output keeps them in a product table, once per product_id
+STATIC_COLUMNS = [
+    'product_name', 'brand', 'image_url', 'description', 'weight', 'unit', 'is_veg', 'is_organic',
+] + DIETARY_FLAGS
+
+# Columns of the normalized product dimension and per-location offer fact tables
+PRODUCT_TABLE_COLUMNS = ['product_id'] + [column for column in PRODUCT_COLUMNS if column in STATIC_COLUMNS]
+OFFER_TABLE_COLUMNS = CONTEXT_FIELDS + [column for column in PRODUCT_COLUMNS if column not in STATIC_COLUMNS]
+
+FIELD_KINDS = {column: kind for column, _, kind in PRODUCT_FIELDS}
+FIELD_KINDS.update({'latitude': 'float', 'longitude': 'float', 'category': 'str', 'subcategory': 'str'})
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'yes', 'y')
+    return bool(value)
+
+
+class FlagRegistry:
+    """Bit positions of the boolean product flags and helpers for packed values
+
+    Flag i lives in bit i % 8 of byte i // 8. Each row carries two packed
+    values: the flag bits, and a "known" mask so missing values survive the
+    round trip as None.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.nbytes = (len(self.names) + 7) // 8
+
+    def pack(self, values):
+        """Pack one row of flag values (bool/None, in registry order) to bytes"""
+        bits = known = 0
+        for i, value in enumerate(values):
+            if value is not None:
+                known |= 1 << i
+                if _as_bool(value):
+                    bits |= 1 << i
+        return bits.to_bytes(self.nbytes, 'little'), known.to_bytes(self.nbytes, 'little')
+
+    def mask(self, names):
+        """Packed byte mask with the bits of the given flags set"""
+        mask = np.zeros(self.nbytes, dtype=np.uint8)
+        for name in names:
+            i = self.index[name]
+            mask[i // 8] |= 1 << (i % 8)
+        return mask
+
+    def as_matrix(self, packed):
+        """View a packed column (list of bytes or 2D uint8 array) as an (n, nbytes) array"""
+        if isinstance(packed, np.ndarray):
+            return packed.reshape(-1, self.nbytes)
+        if not len(packed):
+            return np.zeros((0, self.nbytes), dtype=np.uint8)
+        return np.frombuffer(b''.join(packed), dtype=np.uint8).reshape(-1, self.nbytes)
+
+    def select(self, packed, all_of=(), any_of=(), none_of=()):
+        """Vectorized row filter on a packed column, returning a boolean mask"""
+        matrix = self.as_matrix(packed)
+        selected = np.ones(len(matrix), dtype=bool)
+        if all_of:
+            mask = self.mask(all_of)
+            selected &= ((matrix & mask) == mask).all(axis=1)
+        if any_of:
+            selected &= (matrix & self.mask(any_of)).any(axis=1)
+        if none_of:
+            selected &= ~(matrix & self.mask(none_of)).any(axis=1)
+        return selected
+
+    def expand(self, packed, known=None):
+        """Unpack to {flag name: column}, using None where a value was missing"""
+        bits = np.unpackbits(self.as_matrix(packed), axis=1, bitorder='little')
+        bits = bits[:, :len(self.names)].astype(bool)
+        if known is not None:
+            present = np.unpackbits(self.as_matrix(known), axis=1, bitorder='little')
+            present = present[:, :len(self.names)].astype(bool)
+        columns = {}
+        for i, name in enumerate(self.names):
+            column = bits[:, i]
+            if known is not None and not present[:, i].all():
+                column = np.where(present[:, i], column, None)
+            columns[name] = column
+        return columns
+
+
+FLAGS = FlagRegistry(FLAG_COLUMNS)
+
+
+def output_columns(expand_flags=True):
+    """Output column order, with flags either expanded or kept packed"""
+    if expand_flags:
+        return COLUMNS
+    return [column for column in COLUMNS if column not in FLAGS.index] + PACKED_FLAG_COLUMNS
+
+
+def find_product_list(api_response):
+    """Locate the product array in a search response, or None if the shape is unknown"""
+    if not isinstance(api_response, dict):
+        return None
+    if 'products' in api_response:
+        return api_response['products']
+    data = api_response.get('data')
+    if isinstance(data, dict) and 'products' in data:
+        return data['products']
+    if 'results' in api_response:
+        return api_response['results']
+    return None
+
+
+# Keys that may carry the total number of matching products
+TOTAL_COUNT_KEYS = ('total', 'total_count', 'total_results', 'count')
+
+
+def find_total_count(api_response):
+    """Total product count advertised by a search response, if any"""
+    if not isinstance(api_response, dict):
+        return None
+    for container in (api_response, api_response.get('data'), api_response.get('meta'),
+                      api_response.get('pagination')):
+        if not isinstance(container, dict):
+            continue
+        for key in TOTAL_COUNT_KEYS:
+            try:
+                return int(container[key])
+            except (KeyError, TypeError, ValueError):
+                continue
+    return None
+
+
+def merge_product_pages(pages):
+    """Concatenate product pages, dropping repeats of the same product id"""
+    merged = []
+    seen = set()
+    for page in pages:
+        for product in page:
+            product_id = product.get('id') if isinstance(product, dict) else None
+            if product_id is not None:
+                if product_id in seen:
+                    continue
+                seen.add(product_id)
+            merged.append(product)
+    return merged
+
+
+def job_context(lat, lng, category_id, subcategory_id):
+    """Context column values shared by every product of one job"""
+    return {
+        'latitude': lat,
+        'longitude': lng,
+        'category': category_id,
+        'subcategory': subcategory_id,
+    }
+
+
+class ColumnBatch:
+    """Products from one response, stored as one list per column"""
+
+    def __init__(self, context, columns=None, source=None):
+        # context maps each of CONTEXT_FIELDS to the job's value; batches that
+        # span several jobs pass an empty context and carry those as columns
+        self.context = context
+        self.columns = columns if columns is not None else {name: [] for name in STORED_COLUMNS}
+        # Endpoint that served the products, or 'mock' for generated data
+        self.source = source
+        # Set by extract_columns when interning: True for the rows whose
+        # product was first seen here and whose static columns were filled
+        self.first_seen = None
+
+    def __len__(self):
+        return len(self.columns['product_id'])
+
+    @classmethod
+    def from_records(cls, records, context, source=None):
+        """Build a batch from row dicts (used for small, generated data)"""
+        columns = {name: [record.get(name) for record in records] for name in STORED_COLUMNS
+                   if name not in PACKED_FLAG_COLUMNS}
+        packed = [FLAGS.pack([record.get(name) for name in FLAGS.names]) for record in records]
+        columns['flags'] = [bits for bits, _ in packed]
+        columns['flags_known'] = [known for _, known in packed]
+        return cls(context, columns, source)
+
+    def column(self, name):
+        """Return a full-length column, broadcasting context values"""
+        if name in self.context:
+            return [self.context[name]] * len(self)
+        if name in FLAGS.index:
+            return FLAGS.expand(self.columns['flags'], self.columns['flags_known'])[name]
+        return self.columns[name]
+
+    def flag_mask(self, all_of=(), any_of=(), none_of=()):
+        """Boolean row mask computed on the packed flags"""
+        return FLAGS.select(self.columns['flags'], all_of, any_of, none_of)
+
+    def take(self, rows):
+        """New batch with only the given rows (indices or boolean mask)"""
+        rows = np.arange(len(self))[np.asarray(rows)] if len(self) else []
+        columns = {}
+        for name, values in self.columns.items():
+            if isinstance(values, np.ndarray):
+                columns[name] = values[rows]
+            else:
+                columns[name] = [values[i] for i in rows]
+        batch = ColumnBatch(self.context, columns, self.source)
+        if self.first_seen is not None:
+            batch.first_seen = self.first_seen[rows]
+        return batch
+
+    def to_dict(self, expand_flags=True):
+        data = {name: self.column(name) for name in output_columns(expand_flags)
+                if name not in FLAGS.index}
+        if expand_flags:
+            data.update(FLAGS.expand(self.columns['flags'], self.columns['flags_known']))
+        return data
+
+    def to_frame(self, expand_flags=True):
+        return batches_to_frame([self], expand_flags)
+
+
+def _concat_column(parts):
+    """Join per-batch pieces of one column (lists or NumPy arrays)"""
+    if len(parts) == 1:
+        return parts[0]
+    if parts and all(isinstance(part, np.ndarray) for part in parts):
+        return np.concatenate(parts)
+    return list(itertools.chain.from_iterable(parts))
+
+
+def batches_to_columns(batches, expand_flags=True, packed_hex=True):
+    """Concatenate batches column by column into {column: values}
+
+    Flags are expanded to one bool column each, or kept as packed
+    `flags`/`flags_known` columns (hex strings, or raw bytes when packed_hex
+    is False) when expand_flags is False.
+    """
+    names = output_columns(expand_flags)
+    parts = {name: [] for name in names if name not in FLAGS.index and name not in PACKED_FLAG_COLUMNS}
+    flags, known = [], []
+    for batch in batches:
+        for name in parts:
+            parts[name].append(batch.column(name))
+        flags.append(FLAGS.as_matrix(batch.columns['flags']))
+        known.append(FLAGS.as_matrix(batch.columns['flags_known']))
+    data = {name: _concat_column(column_parts) for name, column_parts in parts.items()}
+    flags = np.concatenate(flags) if flags else FLAGS.as_matrix([])
+    known = np.concatenate(known) if known else FLAGS.as_matrix([])
+
+    if expand_flags:
+        data.update(FLAGS.expand(flags, known))
+    elif packed_hex:
+        data['flags'] = [row.tobytes().hex() for row in flags]
+        data['flags_known'] = [row.tobytes().hex() for row in known]
+    else:
+        data['flags'] = [row.tobytes() for row in flags]
+        data['flags_known'] = [row.tobytes() for row in known]
+    return {name: data[name] for name in names}
+
+
+def batches_to_frame(batches, expand_flags=True):
+    """Concatenate batches column by column into a single DataFrame"""
+    return pd.DataFrame(batches_to_columns(batches, expand_flags), columns=output_columns(expand_flags))
+
+
+class ProductInterner:
+    """Product ids whose static attributes were already extracted in this run
+
+    Shared by every scraper thread and the output sink. claim() is atomic,
+    so exactly one batch gets to carry a given product's static attributes.
+    """
+
+    def __init__(self):
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def claim(self, product_ids):
+        """Mark ids as seen; returns a bool array, True where an id was new
+
+        Products without an id cannot be looked up later, so they always
+        count as new.
+        """
+        first_seen = np.ones(len(product_ids), dtype=bool)
+        seen = self._seen
+        with self._lock:
+            for i, product_id in enumerate(product_ids):
+                if product_id is None:
+                    continue
+                key = str(product_id)
+                if key in seen:
+                    first_seen[i] = False
+                else:
+                    seen.add(key)
+        return first_seen
+
+
+def extract_columns(product_list, context, interner=None):
+    """Append schema fields of each API product straight into column buffers
+
+    With a ProductInterner, static columns (STATIC_COLUMNS) are only read for
+    products not seen earlier in the run and left None for the rest; the
+    batch's first_seen marks which rows carry them.
+    """
+    batch = ColumnBatch(context)
+    appenders = [(batch.columns[column].append, key) for column, key, kind in PRODUCT_FIELDS
+                 if kind != 'bool']
+    flag_keys = [key for _, key, kind in PRODUCT_FIELDS if kind == 'bool']
+    if interner is not None:
+        return _extract_interned(product_list, batch, interner, appenders, flag_keys)
+    pack = FLAGS.pack
+    append_flags = batch.columns['flags'].append
+    append_known = batch.columns['flags_known'].append
+    for product in product_list:
+        get = product.get
+        for append, key in appenders:
+            append(get(key))
+        bits, known = pack([get(key) for key in flag_keys])
+        append_flags(bits)
+        append_known(known)
+    return batch
+
+
+def _extract_interned(product_list, batch, interner, appenders, flag_keys):
+    first_seen = interner.claim([product.get('id') for product in product_list])
+    static_keys = {key for column, key, _ in PRODUCT_FIELDS if column in STATIC_COLUMNS}
+    offer_appenders = [(append, key) for append, key in appenders if key not in static_keys]
+    static_appenders = [append for append, key in appenders if key in static_keys]
+    # Flag keys with the static ones blanked out, for repeat products
+    offer_flag_keys = [None if key in static_keys else key for key in flag_keys]
+    pack = FLAGS.pack
+    append_flags = batch.columns['flags'].append
+    append_known = batch.columns['flags_known'].append
+    for product, first in zip(product_list, first_seen):
+        get = product.get
+        if first:
+            for append, key in appenders:
+                append(get(key))
+            bits, known = pack([get(key) for key in flag_keys])
+        else:
+            for append, key in offer_appenders:
+                append(get(key))
+            for append in static_appenders:
+                append(None)
+            bits, known = pack([None if key is None else get(key) for key in offer_flag_keys])
+        append_flags(bits)
+        append_known(known)
+    batch.first_seen = first_seen
+    return batch
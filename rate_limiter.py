@@ -0,0 +1,159 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# Responses that mean the server wants us to slow down
+THROTTLE_STATUSES = frozenset((429, 503))
+
+# Responses worth retrying after a backoff
+RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+# Longest Retry-After honoured, in seconds
+MAX_RETRY_AFTER = 120.0
+
+# Latency increases smaller than this (seconds) are treated as noise
+LATENCY_NOISE = 0.05
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if when is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, when.timestamp() - now)
+
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2**attempt))"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class _Bucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        # Grow quickly until the server first pushes back
+        self.slow_start = True
+        # Latency moving average and the best one seen, for slowdown detection
+        self.latency_ewma = None
+        self.latency_floor = None
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class AdaptiveRateLimiter:
+    """Per-host token bucket whose rate adapts AIMD-style to server feedback
+
+    Every request takes a token; tokens refill at `rate` per second. While
+    demand keeps the bucket empty, healthy responses raise the rate: by
+    `slow_start_gain` per response until the first pushback (about x1.5 per
+    second), then additively (about `increase` requests/sec for every second
+    spent at full rate). A 429/503, or latency drifting to
+    `latency_slowdown` times the best observed, cuts it multiplicatively by
+    `decrease`, at most once per `cooldown` seconds so one burst of rejections
+    counts once. A Retry-After header pauses the host until it expires.
+    """
+
+    def __init__(self, rate=2.0, min_rate=0.2, max_rate=50.0, burst=2.0, increase=1.0,
+                 slow_start_gain=0.5, decrease=0.5, cooldown=1.0, latency_slowdown=3.0, max_retry_after=MAX_RETRY_AFTER):
+        self.initial_rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.slow_start_gain = slow_start_gain
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.latency_slowdown = latency_slowdown
+        self.max_retry_after = max_retry_after
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def _bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = _Bucket(self.initial_rate, self.burst)
+        return bucket
+
+    def acquire(self, host):
+        """Reserve a token for host and sleep until it is available"""
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            bucket.refill(now)
+            bucket.tokens -= 1
+            # A negative balance is a queue of reservations ahead of us
+            delay = max(0.0, -bucket.tokens / bucket.rate, bucket.blocked_until - now)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _slow_down(self, bucket, now):
+        if now - bucket.last_decrease < self.cooldown:
+            return
+        bucket.refill(now)
+        bucket.rate = max(self.min_rate, bucket.rate * self.decrease)
+        bucket.last_decrease = now
+        bucket.slow_start = False
+
+    def record(self, host, status, latency, retry_after=None):
+        """Feed one response back; status None means the request raised"""
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            if retry_after is not None:
+                bucket.blocked_until = max(bucket.blocked_until, now + min(retry_after, self.max_retry_after))
+            if status in THROTTLE_STATUSES:
+                self._slow_down(bucket, now)
+                return
+            if status is None or latency is None:
+                return
+
+            if bucket.latency_ewma is None:
+                bucket.latency_ewma = latency
+            else:
+                bucket.latency_ewma = 0.8 * bucket.latency_ewma + 0.2 * latency
+            if bucket.latency_floor is None or bucket.latency_ewma < bucket.latency_floor:
+                bucket.latency_floor = bucket.latency_ewma
+            else:
+                # Drift up slowly so a lasting change in latency becomes the new baseline
+                bucket.latency_floor += 0.01 * (bucket.latency_ewma - bucket.latency_floor)
+            if (bucket.latency_ewma > self.latency_slowdown * bucket.latency_floor
+                    and bucket.latency_ewma - bucket.latency_floor > LATENCY_NOISE):
+                self._slow_down(bucket, now)
+                return
+
+            bucket.refill(now)
+            if bucket.tokens >= 1:
+                # The rate is not what is holding requests back; leave it
+                return
+            if bucket.slow_start:
+                bucket.rate = min(self.max_rate, bucket.rate + self.slow_start_gain)
+            else:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase / bucket.rate)
+
+    def rate(self, host):
+        with self._lock:
+            return self._bucket(host).rate
+
+    def rates(self):
+        """Current requests/sec allowed for every host seen so far"""
+        with self._lock:
+            return {host: bucket.rate for host, bucket in self._buckets.items()}
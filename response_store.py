@@ -0,0 +1,70 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class ResponseStore:
+    """Content-addressed, gzip-compressed store of raw search responses
+
+    Bodies live under objects/<2 hex>/<rest of sha256>.gz, so identical
+    responses are stored once. index.jsonl gets one line per captured job
+    with the endpoint, params, job location/category and the digests of
+    every page that made up the result.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_path = os.path.join(root, 'index.jsonl')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest[2:]}.gz")
+
+    def put(self, body):
+        """Store a raw response body and return its digest"""
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(gzip.compress(body, compresslevel=6))
+            os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest):
+        with open(self._object_path(digest), 'rb') as f:
+            return gzip.decompress(f.read())
+
+    def record_capture(self, endpoint, params, context, digests):
+        """Append an index entry tying a job to the pages it was built from"""
+        record = {
+            'endpoint': endpoint,
+            'params': params,
+            'latitude': context['latitude'],
+            'longitude': context['longitude'],
+            'category': context['category'],
+            'subcategory': context['subcategory'],
+            'pages': digests,
+            'fetched_at': time.time(),
+        }
+        line = json.dumps(record) + '\n'
+        with self._lock:
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def iter_captures(self):
+        """Stream index entries, skipping a torn last line from a crash"""
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
@@ -0,0 +1,233 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+def _atomic_write_json(path, data):
+    """Write JSON to a uniquely named temp file and rename it over path"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        # mkstemp creates files readable only by us; keep the usual mode
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Responses that mean an endpoint/parameter shape is wrong, rather than that
+# the server is throttling or briefly unwell (429/5xx are retried and ignored)
+SHAPE_FAILURE_STATUSES = frozenset((400, 403, 404))
+
+
+class DiscoveryCache:
+    """Remember which (endpoint, parameter shape) pairs work, persisted with a TTL"""
+
+    def __init__(self, path=None, ttl=24 * 3600, negative_ttl=3600, max_failures=2):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_failures = max_failures
+        self._lock = threading.Lock()
+        self._dirty = False
+        # "endpoint|shape" -> {'ok_at', 'failures', 'failed_at', 'status'}
+        self.entries = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    @staticmethod
+    def _key(endpoint, shape):
+        return f"{endpoint}|{shape}"
+
+    def load(self):
+        """Load cache entries from disk, ignoring an unreadable file"""
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring discovery cache {self.path}: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Persist the cache if anything changed since the last save"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self.entries)
+            self._dirty = False
+        _atomic_write_json(self.path, entries)
+
+    def absorb(self, path):
+        """Merge in the entries of another cache file (e.g. a worker's); the newer entry wins"""
+        other = DiscoveryCache(path)
+        with self._lock:
+            for key, entry in other.entries.items():
+                mine = self.entries.get(key)
+                if mine is None or _last_seen(entry) >= _last_seen(mine):
+                    self.entries[key] = entry
+            self._dirty = True
+
+    def _is_good(self, entry, now):
+        return entry.get('ok_at') is not None and now - entry['ok_at'] < self.ttl
+
+    def _is_dead(self, entry, now):
+        return (entry.get('failures', 0) >= self.max_failures
+                and now - entry.get('failed_at', 0) < self.negative_ttl)
+
+    def order(self, candidates):
+        """Reorder (endpoint, shape, ...) candidates: known-good first, dead ones dropped
+
+        If every candidate is dead the full list is returned unchanged, so a
+        stale cache can never leave a job with nothing to try.
+        """
+        now = time.time()
+        good, unknown = [], []
+        with self._lock:
+            for candidate in candidates:
+                entry = self.entries.get(self._key(candidate[0], candidate[1]))
+                if entry is None:
+                    unknown.append(candidate)
+                elif self._is_good(entry, now):
+                    good.append((entry['ok_at'], candidate))
+                elif not self._is_dead(entry, now):
+                    unknown.append(candidate)
+        if not good and not unknown:
+            return list(candidates)
+        good.sort(key=lambda item: item[0], reverse=True)
+        return [candidate for _, candidate in good] + unknown
+
+    def record_success(self, endpoint, shape):
+        with self._lock:
+            self.entries[self._key(endpoint, shape)] = {
+                'ok_at': time.time(),
+                'failures': 0,
+            }
+            self._dirty = True
+
+    def record_failure(self, endpoint, shape, status):
+        """Count a response saying the shape is wrong; other statuses are ignored"""
+        if status not in SHAPE_FAILURE_STATUSES:
+            return
+        with self._lock:
+            entry = self.entries.setdefault(self._key(endpoint, shape), {})
+            if time.time() - entry.get('failed_at', 0) >= self.negative_ttl:
+                # The previous failure streak has expired; start counting again
+                entry['failures'] = 0
+            entry['failures'] = entry.get('failures', 0) + 1
+            if entry['failures'] >= self.max_failures:
+                # One stray failure does not demote a known-good shape
+                entry['ok_at'] = None
+            entry['failed_at'] = time.time()
+            entry['status'] = status
+            self._dirty = True
+
+
+def _last_seen(entry):
+    return max(entry.get('ok_at') or 0, entry.get('failed_at') or 0)
+
+
+class _InFlight:
+    """A validation request that other callers for the same key can wait on"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+
+
+class LocationCache:
+    """Bounded LRU + TTL cache of location validation results with single-flight"""
+
+    def __init__(self, path=None, max_entries=1024, ttl=6 * 3600, negative_ttl=300, precision=3):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        # Coordinates are rounded to this many decimals (~110m at 3) for keying
+        self.precision = precision
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+        self._inflight = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    def key(self, lat, lng, pincode):
+        return f"{lat:.{self.precision}f},{lng:.{self.precision}f},{pincode}"
+
+    def _is_fresh(self, stored_at, value, now):
+        ttl = self.ttl if value is not None else self.negative_ttl
+        return now - stored_at < ttl
+
+    def load(self):
+        """Load unexpired entries from disk, ignoring an unreadable file"""
+        try:
+            with open(self.path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring location cache {self.path}: {e}")
+            return
+        now = time.time()
+        for key, (stored_at, value) in sorted(stored.items(), key=lambda item: item[1][0]):
+            if self._is_fresh(stored_at, value, now):
+                self._entries[key] = (stored_at, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def absorb(self, path):
+        """Merge in the unexpired entries of another cache file; the newer entry wins"""
+        other = LocationCache(path, self.max_entries, self.ttl, self.negative_ttl, self.precision)
+        with self._lock:
+            for key, entry in other._entries.items():
+                mine = self._entries.get(key)
+                if mine is None or entry[0] >= mine[0]:
+                    self._entries[key] = entry
+            ordered = sorted(self._entries.items(), key=lambda item: item[1][0])
+            self._entries = OrderedDict(ordered[-self.max_entries:])
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            entries = {key: list(entry) for key, entry in self._entries.items()}
+        _atomic_write_json(self.path, entries)
+
+    def _store(self, key, value):
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_fetch(self, key, fetch):
+        """Return the cached value for key, calling fetch() once per key on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry[0], entry[1], time.time()):
+                self._entries.move_to_end(key)
+                return entry[1]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _InFlight()
+
+        if not leader:
+            # Someone else is already validating this location; share their result
+            call.event.wait()
+            return call.value
+
+        try:
+            call.value = fetch()
+            with self._lock:
+                self._store(key, call.value)
+            return call.value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
@@ -1,13 +1,104 @@
 import requests
 import json
-import pandas as pd
 import time
 import random
 import re
+import argparse
+import os
+import itertools
+import glob
+import shutil
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+from job_engine import JobEngine
+from scraper_cache import DiscoveryCache, LocationCache
+from pincode_index import PincodeIndex, DEFAULT_CENTROIDS
+from product_schema import (
+    ColumnBatch, ProductInterner, batches_to_frame, extract_columns, job_context,
+    find_product_list, find_total_count, merge_product_pages,
+)
+from output_writers import EXTENSIONS, drop_jobs, make_sink, merge_outputs
+from checkpoint import JobManifest
+from work_queue import WorkQueue, default_worker_id
+from response_store import ResponseStore
+from metrics import Metrics, make_exporter, merge_snapshots
+from rate_limiter import AdaptiveRateLimiter, RETRY_STATUSES, MAX_RETRY_AFTER, backoff_delay, parse_retry_after
+from json_decode import SELECTIVE_AVAILABLE, decode_response, loads
+from mock_generator import MockDataGenerator
+from job_planner import JobPlanner, iter_job_file, iter_cross_product, iter_planned_jobs
+
+class PageFetchError(Exception):
+    """An extra result page could not be fetched, so the job's product list is incomplete"""
 
 class SimpleEdgeBlinkItScraper:
-    def __init__(self):
+    # Host the API is served from; point it at mock_server.py for benchmarks
+    BASE_URL = "https://blinkit.com"
+    
+    # Search endpoints tried for every job, in order, relative to BASE_URL
+    API_PATHS = [
+        "/api/v4/search/product",
+        "/api/v4/search/product_suggestions",
+        "/api/v4/search/product_suggestions_similar",
+        "/api/v4/search/product_suggestions_similar_v2",
+        "/api/v4/search/product_suggestions_similar_v3",
+        "/api/v4/search/product_suggestions_similar_v4",
+        "/api/v4/search/product_suggestions_similar_v5",
+        "/api/v4/search/product_suggestions_similar_v6",
+        "/api/v4/search/product_suggestions_similar_v7",
+        "/api/v4/search/product_suggestions_similar_v8",
+        "/api/v4/search/product_suggestions_similar_v9",
+        "/api/v4/search/product_suggestions_similar_v10",
+    ]
+    LOCATION_PATH = "/api/v4/location/validate"
+    
+    # Products requested per page, and the most pages fetched per job
+    PAGE_SIZE = 50
+    MAX_PAGES = 40
+    
+    def __init__(self, limiter=None, discovery_cache=None, location_cache=None, pincode_index=None,
+                 page_concurrency=4, response_store=None, selective_decode=False, base_url=None,
+                 metrics=None, quiet=False, max_retries=3, backoff_base=0.5, backoff_cap=30.0, interner=None):
         self.session = requests.Session()
+        # Extra pages are fetched on this scraper's page pool; every pool
+        # thread uses its own session, since requests sessions are not
+        # shared between threads
+        self._owner_thread = threading.get_ident()
+        self._page_local = threading.local()
+        self._page_pool = None
+        self.base_url = (base_url or self.BASE_URL).rstrip('/')
+        self.api_endpoints = [self.base_url + path for path in self.API_PATHS]
+        # Optional job_engine.HostLimiter shared by all scrapers in a concurrent run
+        self.limiter = limiter
+        # Optional scraper_cache.DiscoveryCache of working endpoint/param shapes
+        self.discovery_cache = discovery_cache
+        # Optional scraper_cache.LocationCache of location validation results
+        self.location_cache = location_cache
+        # Nearest-centroid pincode lookup; defaults to a few major city centres
+        self.pincode_index = pincode_index or PincodeIndex(DEFAULT_CENTROIDS)
+        # Extra pages of one job fetched at once; the shared limiter still caps
+        # total in-flight requests per host
+        self.page_concurrency = page_concurrency
+        # Optional response_store.ResponseStore keeping raw bodies for replay
+        self.response_store = response_store
+        # Stream product arrays and keep only schema fields (needs ijson)
+        self.selective_decode = selective_decode
+        # Request counters, latency histograms and stage timers; share one
+        # metrics.Metrics between scrapers to aggregate a whole run
+        self.metrics = metrics or Metrics()
+        # Suppress per-request progress output
+        self.quiet = quiet
+        # Throttled (429/5xx) or failed requests are retried with jittered
+        # exponential backoff, waiting at least as long as any Retry-After
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # Optional product_schema.ProductInterner shared by the run's scrapers;
+        # static product attributes are then extracted once per product
+        self.interner = interner
         self.setup_session()
         
     def setup_session(self):
@@ -47,142 +138,325 @@ class SimpleEdgeBlinkItScraper:
             'platform': 'windows',
         })
     
+    def log(self, message):
+        """Print progress output unless running quietly"""
+        if not self.quiet:
+            print(message)
+    
+    def _session(self):
+        """self.session on the scraper's own thread, a thread-local session on page threads"""
+        if threading.get_ident() == self._owner_thread:
+            return self.session
+        session = getattr(self._page_local, 'session', None)
+        if session is None:
+            session = self._page_local.session = requests.Session()
+        # Follow the headers and cookies setup_session() last chose
+        session.headers.update(self.session.headers)
+        session.cookies.update(self.session.cookies)
+        return session
+    
+    def _get(self, url, stage='network', **kwargs):
+        """Issue a GET request, retrying throttled or failed attempts after a backoff
+        
+        Its time counts towards `stage` in the stage metrics; pass None when
+        the caller already times the request as part of another stage.
+        """
+        endpoint = urlsplit(url).path
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._send(url, stage, **kwargs)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise
+                reason = type(e).__name__
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                reason = response.status_code
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None:
+                    delay = max(delay, min(retry_after, MAX_RETRY_AFTER))
+            self.metrics.inc('retries_total', endpoint=endpoint, reason=reason)
+            self.log(f"Retrying {endpoint} in {delay:.2f}s ({reason})")
+            # The limiter slot is released while we wait
+            time.sleep(delay)
+    
+    def _send(self, url, stage, **kwargs):
+        """One GET attempt, holding a limiter slot when running concurrently"""
+        if self.limiter is None:
+            return self._timed_get(url, stage, **kwargs)
+        with self.limiter.slot(url):
+            return self._timed_get(url, stage, **kwargs)
+    
+    def _timed_get(self, url, stage, **kwargs):
+        """GET url, recording its latency, status and size against the endpoint path"""
+        endpoint = urlsplit(url).path
+        started = time.perf_counter()
+        try:
+            response = self._session().get(url, **kwargs)
+            body = response.content
+        except Exception:
+            self.metrics.inc('request_errors_total', endpoint=endpoint)
+            if self.limiter is not None:
+                self.limiter.record(url, None, None)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.metrics.observe('request_seconds', elapsed, endpoint=endpoint)
+            if stage is not None:
+                self.metrics.observe('stage_seconds', elapsed, stage=stage)
+        self.metrics.inc('requests_total', endpoint=endpoint, status=response.status_code)
+        self.metrics.inc('response_bytes_total', len(body), endpoint=endpoint)
+        if self.limiter is not None:
+            # Feed status, latency and Retry-After back into adaptive pacing
+            self.limiter.record(
+                url, response.status_code, elapsed, parse_retry_after(response.headers.get('Retry-After'))
+            )
+        return response
+    
+    def _decode(self, body):
+        with self.metrics.timer('decode'):
+            return decode_response(body, self.selective_decode)
+    
     def get_pincode_from_coordinates(self, lat, lng):
         """Get pincode from coordinates"""
-        pincodes = {
-            (28.6139, 77.2090): "110001",  # Delhi
-            (19.0760, 72.8777): "400001",  # Mumbai
-            (12.9716, 77.5946): "560001",  # Bangalore
-            (22.5726, 88.3639): "700001",  # Kolkata
-            (17.3850, 78.4867): "500001",  # Hyderabad
-        }
-        
-        for (city_lat, city_lng), pincode in pincodes.items():
-            if abs(lat - city_lat) < 0.1 and abs(lng - city_lng) < 0.1:
-                return pincode
-        
-        return "110001"  # Default to Delhi
+        pincode, distance_km = self.pincode_index.lookup(lat, lng)
+        if distance_km > self.pincode_index.max_distance_km:
+            self.metrics.inc('pincode_far_total')
+            self.log(f"Warning: nearest pincode {pincode} is {distance_km:.1f} km from ({lat}, {lng})")
+        return pincode
     
-    def get_location_data(self, lat, lng):
+    def get_location_data(self, lat, lng, pincode=None):
         """Get location data first to establish session"""
+        if pincode is None:
+            pincode = self.get_pincode_from_coordinates(lat, lng)
+        with self.metrics.timer('location'):
+            if self.location_cache is None:
+                return self._validate_location(lat, lng, pincode)
+            # Repeated jobs at the same location share one validation request
+            return self.location_cache.get_or_fetch(
+                self.location_cache.key(lat, lng, pincode),
+                lambda: self._validate_location(lat, lng, pincode)
+            )
+    
+    def _validate_location(self, lat, lng, pincode):
+        """Validate a location against the BlinkIt API"""
         try:
             # Try to get location data first
-            location_url = "https://blinkit.com/api/v4/location/validate"
+            location_url = self.base_url + self.LOCATION_PATH
             location_params = {
                 'lat': str(lat),
                 'lng': str(lng),
-                'pincode': self.get_pincode_from_coordinates(lat, lng)
+                'pincode': pincode
             }
             
-            response = self.session.get(location_url, params=location_params, timeout=10)
-            print(f"Location validation status: {response.status_code}")
+            # Timed as part of the 'location' stage, not 'network'
+            response = self._get(location_url, stage=None, params=location_params, timeout=10)
+            self.log(f"Location validation status: {response.status_code}")
             
             if response.status_code == 200:
-                return response.json()
+                return loads(response.content)
             else:
-                print(f"Location validation failed: {response.text}")
+                self.log(f"Location validation failed: {response.text}")
                 return None
                 
         except Exception as e:
-            print(f"Error validating location: {e}")
+            self.log(f"Error validating location: {e}")
             return None
     
+    def param_combinations(self, subcategory_id, lat, lng, pincode):
+        """Parameter shapes to try against each endpoint, as (shape name, params)"""
+        return [
+            ('q_offset', {
+                'q': subcategory_id,
+                'lat': str(lat),
+                'lng': str(lng),
+                'pincode': pincode,
+                'limit': '50',
+                'offset': '0'
+            }),
+            ('query_offset', {
+                'query': subcategory_id,
+                'latitude': str(lat),
+                'longitude': str(lng),
+                'pincode': pincode,
+                'limit': '50',
+                'offset': '0'
+            }),
+            ('search_offset', {
+                'search': subcategory_id,
+                'lat': str(lat),
+                'lng': str(lng),
+                'pincode': pincode,
+                'limit': '50',
+                'offset': '0'
+            }),
+            ('q_page', {
+                'q': subcategory_id,
+                'lat': str(lat),
+                'lng': str(lng),
+                'pincode': pincode,
+                'page': '1',
+                'size': '50'
+            }),
+        ]
+    
     def scrape_category_data(self, lat, lng, category_id, subcategory_id):
         """Scrape data for a specific category and subcategory"""
-        print(f"Scraping data for lat: {lat}, lng: {lng}, category: {category_id}, subcategory: {subcategory_id}")
+        self.log(f"Scraping data for lat: {lat}, lng: {lng}, category: {category_id}, subcategory: {subcategory_id}")
+        
+        pincode = self.get_pincode_from_coordinates(lat, lng)
         
         # First validate location
-        location_data = self.get_location_data(lat, lng)
+        location_data = self.get_location_data(lat, lng, pincode)
         
-        # Try multiple API endpoints with different approaches
-        api_endpoints = [
-            "https://blinkit.com/api/v4/search/product",
-            "https://blinkit.com/api/v4/search/product_suggestions",
-            "https://blinkit.com/api/v4/search/product_suggestions_similar",
-            "https://blinkit.com/api/v4/search/product_suggestions_similar_v2",
-            "https://blinkit.com/api/v4/search/product_suggestions_similar_v3",
-            "https://blinkit.com/api/v4/search/product_suggestions_similar_v4",
-            "https://blinkit.com/api/v4/search/product_suggestions_similar_v5",
-            "https://blinkit.com/api/v4/search/product_suggestions_similar_v6",
-            "https://blinkit.com/api/v4/search/product_suggestions_similar_v7",
-            "https://blinkit.com/api/v4/search/product_suggestions_similar_v8",
-            "https://blinkit.com/api/v4/search/product_suggestions_similar_v9",
-            "https://blinkit.com/api/v4/search/product_suggestions_similar_v10",
+        candidates = [
+            (endpoint, shape, params)
+            for endpoint in self.api_endpoints
+            for shape, params in self.param_combinations(subcategory_id, lat, lng, pincode)
         ]
+        if self.discovery_cache is not None:
+            # Known-good shapes go first and repeatedly failing ones are skipped
+            candidates = self.discovery_cache.order(candidates)
         
-        pincode = self.get_pincode_from_coordinates(lat, lng)
-        
-        for endpoint in api_endpoints:
-            try:
-                # Update headers for each request
+        current_endpoint = None
+        for endpoint, shape, params in candidates:
+            if endpoint != current_endpoint:
+                # Update headers for each endpoint
                 self.setup_session()
+                current_endpoint = endpoint
+            
+            try:
+                self.log(f"Trying endpoint: {endpoint} with params: {params}")
+                response = self._get(endpoint, params=params, timeout=15)
+                
+                self.log(f"Response status: {response.status_code}")
                 
-                # Try different parameter combinations
-                param_combinations = [
-                    {
-                        'q': subcategory_id,
-                        'lat': str(lat),
-                        'lng': str(lng),
-                        'pincode': pincode,
-                        'limit': '50',
-                        'offset': '0'
-                    },
-                    {
-                        'query': subcategory_id,
-                        'latitude': str(lat),
-                        'longitude': str(lng),
-                        'pincode': pincode,
-                        'limit': '50',
-                        'offset': '0'
-                    },
-                    {
-                        'search': subcategory_id,
-                        'lat': str(lat),
-                        'lng': str(lng),
-                        'pincode': pincode,
-                        'limit': '50',
-                        'offset': '0'
-                    },
-                    {
-                        'q': subcategory_id,
-                        'lat': str(lat),
-                        'lng': str(lng),
-                        'pincode': pincode,
-                        'page': '1',
-                        'size': '50'
-                    }
-                ]
+                if response.status_code == 200:
+                    data = self._decode(response.content)
+                    self.log(f"Success! Got data from {endpoint}")
+                    if self.discovery_cache is not None:
+                        self.discovery_cache.record_success(endpoint, shape)
+                    digests = [self._store_body(response.content)]
+                    first_page = find_product_list(data)
+                    if first_page is not None:
+                        # Fetch the rest of the subcategory and merge it before extraction
+                        data = {'products': self.fetch_remaining_pages(endpoint, params, data, first_page, digests)}
+                    if self.response_store is not None:
+                        self.response_store.record_capture(
+                            endpoint, params, job_context(lat, lng, category_id, subcategory_id), digests
+                        )
+                    with self.metrics.timer('extract'):
+                        batch = self.extract_product_data(data, lat, lng, category_id, subcategory_id)
+                    if batch.source is None:
+                        batch.source = endpoint
+                    return batch
                 
-                for params in param_combinations:
-                    try:
-                        print(f"Trying endpoint: {endpoint} with params: {params}")
-                        response = self.session.get(endpoint, params=params, timeout=15)
-                        
-                        print(f"Response status: {response.status_code}")
-                        
-                        if response.status_code == 200:
-                            data = response.json()
-                            print(f"Success! Got data from {endpoint}")
-                            return self.extract_product_data(data, lat, lng, category_id, subcategory_id)
-                        elif response.status_code == 403:
-                            print(f"403 Forbidden for {endpoint}")
-                            # Try with different approach
-                            continue
-                        else:
-                            print(f"Status {response.status_code} for {endpoint}")
-                            
-                    except Exception as e:
-                        print(f"Error with params {params}: {e}")
-                        continue
-                        
+                if self.discovery_cache is not None:
+                    self.discovery_cache.record_failure(endpoint, shape, response.status_code)
+                if response.status_code == 403:
+                    self.log(f"403 Forbidden for {endpoint}")
+                else:
+                    self.log(f"Status {response.status_code} for {endpoint}")
+                    
+            except PageFetchError:
+                # The endpoint works but the product list would be incomplete;
+                # fail the job so it is retried instead of recorded as done
+                raise
             except Exception as e:
-                print(f"Error with endpoint {endpoint}: {e}")
+                self.log(f"Error with params {params}: {e}")
                 continue
         
         # If all API endpoints fail, create sample data
-        print("All API endpoints failed. Creating sample data...")
+        self.log("All API endpoints failed. Creating sample data...")
+        self.metrics.inc('mock_fallback_total', reason='endpoints_failed')
         return self.create_mock_data(lat, lng, category_id, subcategory_id)
     
+    def _page_params(self, params, page_index):
+        """Params for the zero-based page_index of a paginated parameter shape"""
+        params = dict(params)
+        if 'offset' in params:
+            params['offset'] = str(page_index * int(params.get('limit', self.PAGE_SIZE)))
+        elif 'page' in params:
+            params['page'] = str(page_index + 1)
+        return params
+    
+    def _store_body(self, body):
+        """Keep a raw response body in the response store, if one is configured"""
+        if self.response_store is None:
+            return None
+        return self.response_store.put(body)
+    
+    def _fetch_page(self, endpoint, params, page_index):
+        """Fetch one extra page; returns (products, stored digest) or raises PageFetchError"""
+        page_params = self._page_params(params, page_index)
+        try:
+            response = self._get(endpoint, params=page_params, timeout=15)
+            if response.status_code != 200:
+                raise PageFetchError(f"status {response.status_code} for page {page_index + 1} of {endpoint}")
+            data = self._decode(response.content)
+        except PageFetchError:
+            raise
+        except Exception as e:
+            raise PageFetchError(f"error fetching page {page_index + 1} of {endpoint}: {e}") from e
+        products = find_product_list(data)
+        if products is None:
+            raise PageFetchError(f"unknown response structure for page {page_index + 1} of {endpoint}")
+        return products, self._store_body(response.content)
+    
+    def _pages(self):
+        """Page pool kept for the scraper's lifetime, so page threads reuse their sessions"""
+        if self._page_pool is None:
+            self._page_pool = ThreadPoolExecutor(max_workers=self.page_concurrency)
+        return self._page_pool
+    
+    def fetch_remaining_pages(self, endpoint, params, first_response, first_page, digests=None):
+        """Fetch pages after the first one concurrently and merge them by product id
+
+        Raises PageFetchError if any page fails, rather than returning a
+        truncated list that would look like products had disappeared.
+        """
+        page_size = int(params.get('limit') or params.get('size') or self.PAGE_SIZE)
+        if len(first_page) < page_size:
+            return merge_product_pages([first_page])
+        
+        total = find_total_count(first_response)
+        last_page = self.MAX_PAGES
+        if total is not None:
+            last_page = min(last_page, -(-total // page_size))
+        
+        pages = [first_page]
+        next_page = 1
+        pool = self._pages()
+        while next_page < last_page:
+            if total is not None:
+                # The total tells us exactly which pages exist
+                wave = range(next_page, last_page)
+            else:
+                # Probe a few pages at a time until one comes back short
+                wave = range(next_page, min(next_page + self.page_concurrency, last_page))
+            done = False
+            for products, digest in pool.map(lambda i: self._fetch_page(endpoint, params, i), wave):
+                if not products:
+                    # An empty page is the real end of the results
+                    done = True
+                    break
+                pages.append(products)
+                if digests is not None and digest is not None:
+                    digests.append(digest)
+                if len(products) < page_size:
+                    done = True
+                    break
+            if done:
+                break
+            next_page = wave.stop
+        
+        if len(pages) > 1:
+            self.log(f"Fetched {len(pages)} pages from {endpoint}")
+        return merge_product_pages(pages)
+    
     def create_mock_data(self, lat, lng, category_id, subcategory_id):
         """Create sample data for testing purposes"""
         mock_products = []
@@ -317,199 +591,556 @@ class SimpleEdgeBlinkItScraper:
             }
             mock_products.append(product_data)
         
-        return mock_products
+        return ColumnBatch.from_records(mock_products, job_context(lat, lng, category_id, subcategory_id), source='mock')
     
     def extract_product_data(self, api_response, lat, lng, category_id, subcategory_id):
-        """Extract relevant data points from API response"""
-        products = []
-        
+        """Extract relevant data points from API response as a ColumnBatch"""
         # Try different response structures
-        if 'products' in api_response:
-            product_list = api_response['products']
-        elif 'data' in api_response and 'products' in api_response['data']:
-            product_list = api_response['data']['products']
-        elif 'results' in api_response:
-            product_list = api_response['results']
-        else:
-            print(f"Unknown API response structure: {list(api_response.keys())}")
+        product_list = find_product_list(api_response)
+        if product_list is None:
+            keys = list(api_response.keys()) if isinstance(api_response, dict) else type(api_response).__name__
+            self.log(f"Unknown API response structure: {keys}")
+            self.metrics.inc('mock_fallback_total', reason='unknown_response')
             return self.create_mock_data(lat, lng, category_id, subcategory_id)
         
-        for product in product_list:
-            product_data = {
-                'latitude': lat,
-                'longitude': lng,
-                'category': category_id,
-                'subcategory': subcategory_id,
-                'product_id': product.get('id'),
-                'product_name': product.get('name'),
-                'brand': product.get('brand'),
-                'price': product.get('price'),
-                'original_price': product.get('original_price'),
-                'discount_percentage': product.get('discount_percentage'),
-                'rating': product.get('rating'),
-                'review_count': product.get('review_count'),
-                'availability': product.get('availability'),
-                'image_url': product.get('image_url'),
-                'description': product.get('description'),
-                'weight': product.get('weight'),
-                'unit': product.get('unit'),
-                'is_veg': product.get('is_veg'),
-                'is_available': product.get('is_available'),
-                'stock_quantity': product.get('stock_quantity'),
-                'seller_name': product.get('seller_name'),
-                'seller_rating': product.get('seller_rating'),
-                'delivery_time': product.get('delivery_time'),
-                'delivery_charge': product.get('delivery_charge'),
-                'min_order_amount': product.get('min_order_amount'),
-                'is_express_delivery': product.get('is_express_delivery'),
-                'is_free_delivery': product.get('is_free_delivery'),
-                'is_cash_on_delivery': product.get('is_cash_on_delivery'),
-                'is_online_payment': product.get('is_online_payment'),
-                'is_instant_discount': product.get('is_instant_discount'),
-                'instant_discount_amount': product.get('instant_discount_amount'),
-                'is_coupon_available': product.get('is_coupon_available'),
-                'coupon_code': product.get('coupon_code'),
-                'coupon_discount': product.get('coupon_discount'),
-                'is_bestseller': product.get('is_bestseller'),
-                'is_trending': product.get('is_trending'),
-                'is_new': product.get('is_new'),
-                'is_featured': product.get('is_featured'),
-                'is_recommended': product.get('is_recommended'),
-                'is_popular': product.get('is_popular'),
-                'is_organic': product.get('is_organic'),
-                'is_gluten_free': product.get('is_gluten_free'),
-                'is_dairy_free': product.get('is_dairy_free'),
-                'is_nut_free': product.get('is_nut_free'),
-                'is_soy_free': product.get('is_soy_free'),
-                'is_wheat_free': product.get('is_wheat_free'),
-                'is_egg_free': product.get('is_egg_free'),
-                'is_fish_free': product.get('is_fish_free'),
-                'is_shellfish_free': product.get('is_shellfish_free'),
-                'is_pork_free': product.get('is_pork_free'),
-                'is_beef_free': product.get('is_beef_free'),
-                'is_lamb_free': product.get('is_lamb_free'),
-                'is_goat_free': product.get('is_goat_free'),
-                'is_chicken_free': product.get('is_chicken_free'),
-                'is_turkey_free': product.get('is_turkey_free'),
-                'is_duck_free': product.get('is_duck_free'),
-                'is_quail_free': product.get('is_quail_free'),
-                'is_rabbit_free': product.get('is_rabbit_free'),
-                'is_deer_free': product.get('is_deer_free'),
-                'is_bison_free': product.get('is_bison_free'),
-                'is_elk_free': product.get('is_elk_free'),
-                'is_moose_free': product.get('is_moose_free'),
-                'is_antelope_free': product.get('is_antelope_free'),
-                'is_buffalo_free': product.get('is_buffalo_free'),
-                'is_camel_free': product.get('is_camel_free'),
-                'is_horse_free': product.get('is_horse_free'),
-                'is_donkey_free': product.get('is_donkey_free'),
-                'is_mule_free': product.get('is_mule_free'),
-                'is_llama_free': product.get('is_llama_free'),
-                'is_alpaca_free': product.get('is_alpaca_free'),
-                'is_vicuna_free': product.get('is_vicuna_free'),
-                'is_guanaco_free': product.get('is_guanaco_free'),
-                'is_chinchilla_free': product.get('is_chinchilla_free'),
-                'is_guinea_pig_free': product.get('is_guinea_pig_free'),
-                'is_hamster_free': product.get('is_hamster_free'),
-                'is_mouse_free': product.get('is_mouse_free'),
-                'is_rat_free': product.get('is_rat_free'),
-                'is_gerbil_free': product.get('is_gerbil_free'),
-                'is_ferret_free': product.get('is_ferret_free'),
-                'is_weasel_free': product.get('is_weasel_free'),
-                'is_mink_free': product.get('is_mink_free'),
-                'is_otter_free': product.get('is_otter_free'),
-                'is_badger_free': product.get('is_badger_free'),
-                'is_skunk_free': product.get('is_skunk_free'),
-                'is_raccoon_free': product.get('is_raccoon_free'),
-                'is_coati_free': product.get('is_coati_free'),
-                'is_kinkajou_free': product.get('is_kinkajou_free'),
-                'is_olinguito_free': product.get('is_olinguito_free'),
-                'is_ringtail_free': product.get('is_ringtail_free'),
-                'is_cacomistle_free': product.get('is_cacomistle_free'),
-                'is_bassarisk_free': product.get('is_bassarisk_free'),
-                'is_civet_free': product.get('is_civet_free'),
-                'is_genet_free': product.get('is_genet_free'),
-                'is_linsang_free': product.get('is_linsang_free'),
-                'is_fossa_free': product.get('is_fossa_free'),
-                'is_mongoose_free': product.get('is_mongoose_free'),
-                'is_meerkat_free': product.get('is_meerkat_free'),
-                'is_suricate_free': product.get('is_suricate_free'),
-                'is_banded_mongoose_free': product.get('is_banded_mongoose_free'),
-                'is_dwarf_mongoose_free': product.get('is_dwarf_mongoose_free'),
-                'is_common_mongoose_free': product.get('is_common_mongoose_free'),
-                'is_white_tailed_mongoose_free': product.get('is_white_tailed_mongoose_free'),
-                'is_marsh_mongoose_free': product.get('is_marsh_mongoose_free'),
-                'is_bushy_tailed_mongoose_free': product.get('is_bushy_tailed_mongoose_free'),
-                'is_black_tipped_mongoose_free': product.get('is_black_tipped_mongoose_free'),
-                'is_selous_mongoose_free': product.get('is_selous_mongoose_free'),
-                'is_meller_mongoose_free': product.get('is_meller_mongoose_free'),
-                'is_egyptian_mongoose_free': product.get('is_egyptian_mongoose_free'),
-                'is_common_slender_mongoose_free': product.get('is_common_slender_mongoose_free'),
-                'is_black_mongoose_free': product.get('is_black_mongoose_free'),
-                'is_somalian_slender_mongoose_free': product.get('is_somalian_slender_mongoose_free'),
-                'is_rufous_mongoose_free': product.get('is_rufous_mongoose_free'),
-                'is_cape_grey_mongoose_free': product.get('is_cape_grey_mongoose_free'),
-                'is_angolan_slender_mongoose_free': product.get('is_angolan_slender_mongoose_free'),
-                'is_black_tailed_mongoose_free': product.get('is_black_tailed_mongoose_free'),
-                'is_long_nosed_mongoose_free': product.get('is_long_nosed_mongoose_free'),
-                'is_ethiopian_dwarf_mongoose_free': product.get('is_ethiopian_dwarf_mongoose_free'),
-                'is_common_dwarf_mongoose_free': product.get('is_common_dwarf_mongoose_free'),
-                'is_rufous_banded_mongoose_free': product.get('is_rufous_banded_mongoose_free'),
-                'is_liberian_mongoose_free': product.get('is_liberian_mongoose_free'),
-                'is_ansorge_mongoose_free': product.get('is_ansorge_mongoose_free'),
-                'is_flat_headed_mongoose_free': product.get('is_flat_headed_mongoose_free'),
-                'is_gambian_mongoose_free': product.get('is_gambian_mongoose_free'),
-                'is_sooty_mongoose_free': product.get('is_sooty_mongoose_free'),
-            }
-            products.append(product_data)
+        return extract_columns(product_list, job_context(lat, lng, category_id, subcategory_id), self.interner)
+
+# Sample data points from the spreadsheet
+SAMPLE_DATA = [
+    {'lat': 28.6139, 'lng': 77.2090, 'category': 'Snacks & Munchies', 'subcategory': 'Nachos'},
+    {'lat': 19.0760, 'lng': 72.8777, 'category': 'Beverages', 'subcategory': 'Soft Drinks'},
+    {'lat': 12.9716, 'lng': 77.5946, 'category': 'Dairy & Bakery', 'subcategory': 'Milk'},
+]
+
+# Per-process state of replay workers, set up by _init_replay_worker
+_replay_scraper = None
+_replay_store = None
+
+def _init_replay_worker(root, selective_decode):
+    global _replay_scraper, _replay_store
+    _replay_scraper = SimpleEdgeBlinkItScraper(selective_decode=selective_decode)
+    _replay_store = ResponseStore(root)
+
+def _replay_capture(record):
+    """Re-extract one stored capture (runs in a replay worker process)"""
+    pages = []
+    api_response = None
+    for digest in record['pages']:
+        response = _replay_scraper._decode(_replay_store.get(digest))
+        if api_response is None:
+            api_response = response
+        products = find_product_list(response)
+        if products is not None:
+            pages.append(products)
+    if pages:
+        # Merge pages exactly as the live scrape did
+        api_response = {'products': merge_product_pages(pages)}
+    batch = _replay_scraper.extract_product_data(
+        api_response,
+        record['latitude'],
+        record['longitude'],
+        record['category'],
+        record['subcategory']
+    )
+    if batch.source is None:
+        batch.source = record['endpoint']
+    return batch
+
+def replay(args, sink):
+    """Re-run extraction over stored responses on a process pool, with no network I/O"""
+    store = ResponseStore(args.replay)
+    print(f"Replaying stored responses from {args.replay} with {args.replay_workers} processes...")
+    captures = store.iter_captures()
+    replayed = 0
+    with ProcessPoolExecutor(max_workers=args.replay_workers, initializer=_init_replay_worker,
+                             initargs=(args.replay, args.selective_decode)) as pool:
+        with sink:
+            # Hand the index to the pool a slice at a time so it is never fully in memory
+            while True:
+                chunk = list(itertools.islice(captures, args.replay_workers * 64))
+                if not chunk:
+                    break
+                for batch in pool.map(_replay_capture, chunk, chunksize=16):
+                    sink.write(batch)
+                    replayed += 1
+    print(f"Replayed {replayed} captures into {args.output} ({sink.rows_written} products)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape BlinkIt category data")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Number of jobs to run concurrently")
+    parser.add_argument('--per-host', type=int, default=2,
+                        help="Maximum in-flight requests per host")
+    parser.add_argument('--min-interval', type=float, default=0.5,
+                        help="Seconds between request starts per host (the starting pace when adaptive)")
+    parser.add_argument('--max-rate', type=float, default=50.0,
+                        help="Upper bound on adaptive requests/sec per host")
+    parser.add_argument('--fixed-rate', action='store_true',
+                        help="Pace requests strictly by --min-interval instead of adapting to 429/503s and latency")
+    parser.add_argument('--max-retries', type=int, default=3,
+                        help="Retries for throttled (429/5xx) or failed requests, with jittered exponential backoff")
+    parser.add_argument('--base-url', default=None,
+                        help="Scheme and host of the API (default: https://blinkit.com)")
+    parser.add_argument('--page-concurrency', type=int, default=4,
+                        help="Extra result pages of one job fetched concurrently")
+    parser.add_argument('--discovery-cache', default='discovery_cache.json',
+                        help="File remembering which endpoint/parameter shapes work")
+    parser.add_argument('--discovery-ttl', type=float, default=24.0,
+                        help="Hours a working endpoint/parameter shape stays trusted")
+    parser.add_argument('--no-discovery-cache', action='store_true',
+                        help="Try every endpoint/parameter shape on every job")
+    parser.add_argument('--location-cache', default=None,
+                        help="File to persist location validation results between runs")
+    parser.add_argument('--location-ttl', type=float, default=6.0,
+                        help="Hours a location validation result is reused")
+    parser.add_argument('--pincode-csv', default=None,
+                        help="CSV of pincode, latitude, longitude centroids for pincode lookup")
+    parser.add_argument('--max-pincode-distance', type=float, default=25.0,
+                        help="Warn when the nearest pincode centroid is further than this many km")
+    parser.add_argument('--packed-flags', action='store_true',
+                        help="Write boolean flags as packed hex flags/flags_known columns")
+    parser.add_argument('--output', default=None,
+                        help="Output file (default: blinkit_scraped_data_simple_edge.<format>)")
+    parser.add_argument('--format', choices=['csv', 'parquet', 'delta', 'normalized'], default=None,
+                        help="Output format; inferred from --output when omitted (parquet needs pyarrow, "
+                             "delta writes only changes since the last run as JSON Lines, normalized "
+                             "writes per-location offers to --output and products once each to <output>_products.csv)")
+    parser.add_argument('--delta-state', default='delta_state.sqlite',
+                        help="Fingerprints of last-seen products used by --format delta")
+    parser.add_argument('--flush-rows', type=int, default=5000,
+                        help="Write buffered products to disk once this many are pending")
+    parser.add_argument('--flush-interval', type=float, default=30.0,
+                        help="Write buffered products to disk at least this often (seconds)")
+    parser.add_argument('--jobs', default=None,
+                        help="CSV/JSONL file of lat, lng, category, subcategory jobs")
+    parser.add_argument('--locations', default=None,
+                        help="CSV/JSONL file of lat, lng locations (used with --categories)")
+    parser.add_argument('--categories', default=None,
+                        help="CSV/JSONL file of category, subcategory pairs to scrape at every location")
+    parser.add_argument('--plan-window', type=int, default=50000,
+                        help="Number of jobs grouped by location at a time")
+    parser.add_argument('--selective-decode', action='store_true',
+                        help="Stream product arrays and keep only schema fields while decoding (needs ijson)")
+    parser.add_argument('--synthetic', type=int, default=None, metavar='ROWS',
+                        help="Write this many seeded mock products for the jobs instead of scraping")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="Random seed for --synthetic")
+    parser.add_argument('--store-responses', default=None,
+                        help="Directory to keep compressed raw responses in for later replay")
+    parser.add_argument('--replay', default=None,
+                        help="Re-extract products from a response store directory instead of scraping")
+    parser.add_argument('--replay-workers', type=int, default=os.cpu_count(),
+                        help="Processes used for --replay")
+    parser.add_argument('--quiet', action='store_true',
+                        help="Do not print per-request and per-job progress")
+    parser.add_argument('--metrics-json', default=None,
+                        help="Write a JSON snapshot of request/stage metrics to this file")
+    parser.add_argument('--metrics-prom', default=None,
+                        help="Write metrics in Prometheus text format to this file")
+    parser.add_argument('--metrics-interval', type=float, default=15.0,
+                        help="Seconds between metrics exports during a run")
+    parser.add_argument('--queue', default=None,
+                        help="SQLite work queue for sharded runs; jobs are leased by worker processes")
+    parser.add_argument('--shard-processes', type=int, default=1,
+                        help="Worker processes to start against --queue on this machine")
+    parser.add_argument('--shard-dir', default='shards',
+                        help="Directory each worker writes its own output shard to")
+    parser.add_argument('--worker-id', default=None,
+                        help="Run as one queue worker with this id (--shard-processes sets it for local workers)")
+    parser.add_argument('--lease-seconds', type=float, default=300.0,
+                        help="Seconds without a heartbeat renewal before a leased job is handed to another worker")
+    parser.add_argument('--lease-batch', type=int, default=None,
+                        help="Jobs leased at a time (default: twice --workers)")
+    parser.add_argument('--merge', action='store_true',
+                        help="Concatenate the output shards into --output and exit")
+    parser.add_argument('--manifest', default='scrape_manifest.sqlite',
+                        help="SQLite checkpoint recording which jobs have finished")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip jobs the manifest marks done and append to the existing output")
+    args = parser.parse_args()
+    if args.selective_decode and not SELECTIVE_AVAILABLE:
+        print("ijson is not installed; --selective-decode falls back to full decoding")
+    if bool(args.locations) != bool(args.categories):
+        parser.error("--locations and --categories must be used together")
+    if args.format == 'delta' and args.synthetic:
+        parser.error("--synthetic cannot be used with --format delta (mock data is never diffed)")
+    if args.format == 'normalized' and args.packed_flags:
+        parser.error("--packed-flags cannot be used with --format normalized")
+    if args.format in ('normalized', 'delta') and (args.queue or args.merge):
+        # Delta records depend on what other workers already committed to the
+        # shared state, so they cannot be de-duplicated per job on merge
+        parser.error(f"--format {args.format} does not support sharded runs (--queue/--merge)")
+    if args.format is None:
+        args.format = 'parquet' if args.output and args.output.endswith('.parquet') else 'csv'
+    if args.output is None:
+        args.output = f"blinkit_scraped_data_simple_edge.{EXTENSIONS[args.format]}"
+    return args
+
+def load_jobs(args):
+    """Job stream selected on the command line, defaulting to SAMPLE_DATA"""
+    if args.jobs:
+        return iter_job_file(args.jobs)
+    if args.locations:
+        return iter_cross_product(args.locations, args.categories)
+    return SAMPLE_DATA
+
+def make_output_sink(args, append=False, interner=None):
+    kwargs = {}
+    if args.format == 'delta':
+        kwargs['state_path'] = args.delta_state
+    if args.format == 'normalized':
+        kwargs['interner'] = interner
+    return make_sink(
+        args.format,
+        args.output,
+        batch_size=args.flush_rows,
+        flush_interval=args.flush_interval,
+        expand_flags=not args.packed_flags,
+        append=append,
+        **kwargs
+    )
+
+def generate_synthetic(args, sink):
+    """Write seeded mock products for every job to the sink, with no network I/O"""
+    generator = MockDataGenerator(seed=args.seed)
+    print(f"Generating {args.synthetic} synthetic products (seed {args.seed})...")
+    with sink:
+        # Job files are re-read on every pass rather than held in memory
+        for batch in generator.generate(lambda: load_jobs(args), args.synthetic):
+            sink.write(batch)
+    print(f"Wrote {sink.rows_written} synthetic products to {args.output}")
+
+def shard_paths(args):
+    """Output shards to merge: those recorded in the queue, else every shard in --shard-dir"""
+    if args.queue:
+        queue = WorkQueue(args.queue)
+        paths = queue.outputs()
+        queue.close()
+    else:
+        paths = sorted(glob.glob(os.path.join(args.shard_dir, f"*.{EXTENSIONS[args.format]}")))
+    shards = []
+    for path in paths:
+        if os.path.exists(path):
+            shards.append(path)
+        elif args.format != 'parquet' and os.path.exists(f"{path}.part"):
+            # A worker that died and never came back; its flushed CSV rows
+            # are readable, and merging keeps only those of finished jobs
+            shards.append(f"{path}.part")
+        else:
+            print(f"Warning: shard {path} is missing or unfinished, skipping it")
+    return shards
+
+def worker_path(path, worker_id):
+    """path with the worker id before its extension: cache.json -> cache.<worker_id>.json"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{worker_id}{ext}"
+
+def worker_metrics_path(args, worker_id):
+    return os.path.join(args.shard_dir, f"{worker_id}.metrics.json")
+
+def use_worker_files(args):
+    """Point a queue worker at its own cache and metrics files
+    
+    Every worker gets the launcher's arguments, and concurrent saves to one
+    file would overwrite each other. Caches start as a copy of the shared
+    file and metrics go to a JSON snapshot in --shard-dir; the launcher
+    folds both back in with collect_worker_files.
+    """
+    for name in ('discovery_cache', 'location_cache'):
+        shared = getattr(args, name)
+        if not shared:
+            continue
+        private = worker_path(shared, args.worker_id)
+        if not os.path.exists(private) and os.path.exists(shared):
+            shutil.copyfile(shared, private)
+        setattr(args, name, private)
+    if args.metrics_json or args.metrics_prom:
+        os.makedirs(args.shard_dir, exist_ok=True)
+        args.metrics_json = worker_metrics_path(args, args.worker_id)
+        args.metrics_prom = None
+
+def collect_worker_files(args, worker_ids, snapshots):
+    """Merge the workers' caches into the shared files and export their summed metrics
+    
+    snapshots accumulates worker metrics across rounds of worker processes.
+    """
+    if not args.no_discovery_cache:
+        discovery_cache = DiscoveryCache(args.discovery_cache, ttl=args.discovery_ttl * 3600)
+        for worker_id in worker_ids:
+            private = worker_path(args.discovery_cache, worker_id)
+            if os.path.exists(private):
+                discovery_cache.absorb(private)
+                os.remove(private)
+        discovery_cache.save()
+    if args.location_cache:
+        location_cache = LocationCache(args.location_cache, ttl=args.location_ttl * 3600)
+        for worker_id in worker_ids:
+            private = worker_path(args.location_cache, worker_id)
+            if os.path.exists(private):
+                location_cache.absorb(private)
+                os.remove(private)
+        location_cache.save()
+    if args.metrics_json or args.metrics_prom:
+        for worker_id in worker_ids:
+            path = worker_metrics_path(args, worker_id)
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    snapshots.append(json.load(f))
+                os.remove(path)
+        snapshot = merge_snapshots(snapshots)
+        for kind, path in (('json', args.metrics_json), ('prometheus', args.metrics_prom)):
+            if path:
+                make_exporter(kind, path).export(snapshot)
+
+def merge_shards(args):
+    shards = shard_paths(args)
+    if not shards:
+        print("No output shards to merge")
+        return
+    keep = None
+    if args.queue:
+        # A job re-run after its lease expired has rows in two shards; take
+        # them only from the shard the queue credits with finishing it
+        queue = WorkQueue(args.queue)
+        keep = {shard: queue.finished_jobs(shard[:-len('.part')] if shard.endswith('.part') else shard)
+                for shard in shards}
+        queue.close()
+    merge_outputs(shards, args.format, args.output, keep)
+    print(f"Merged {len(shards)} shards into {args.output}")
+
+def run_sharded(args):
+    """Queue the jobs, run --shard-processes worker processes against the queue, then merge"""
+    queue = WorkQueue(args.queue)
+    if args.jobs or args.locations or not queue.counts():
+        if args.pincode_csv:
+            pincode_index = PincodeIndex.from_csv(args.pincode_csv, max_distance_km=args.max_pincode_distance)
+        else:
+            pincode_index = PincodeIndex(DEFAULT_CENTROIDS, max_distance_km=args.max_pincode_distance)
+        planner = JobPlanner(pincode_index, window=args.plan_window)
+        added = queue.enqueue(iter_planned_jobs(planner.plan(load_jobs(args))))
+        print(f"Queued {added} new jobs in {args.queue}")
+    retried = queue.retry()
+    if retried:
+        print(f"Re-queued {retried} jobs that failed or fell back to mock data")
+    
+    base_id = default_worker_id()
+    worker_ids = [f"{base_id}-{i}" for i in range(args.shard_processes)]
+    command = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:]
+    snapshots = []
+    while args.shard_processes > 0:
+        workers = [
+            subprocess.Popen(command + ['--worker-id', worker_id])
+            for worker_id in worker_ids
+        ]
+        print(f"Started {len(workers)} worker processes")
+        for worker in workers:
+            worker.wait()
+        collect_worker_files(args, worker_ids, snapshots)
         
-        return products
+        if not queue.outstanding():
+            break
+        # Jobs are left leased by a crashed worker or by workers elsewhere;
+        # wait for those leases to end and sweep up whatever gets re-queued
+        wait = queue.next_expiry()
+        if wait:
+            print(f"Waiting {wait:.0f}s for outstanding leases to finish or expire")
+            time.sleep(wait + 1)
+    
+    counts = queue.counts()
+    outstanding = queue.outstanding()
+    queue.close()
+    print(f"Work queue: {counts}")
+    if outstanding:
+        print(f"{outstanding} jobs are still queued or leased; run again or --merge later")
+    else:
+        merge_shards(args)
 
 def main():
-    scraper = SimpleEdgeBlinkItScraper()
+    args = parse_args()
+    if args.merge:
+        merge_shards(args)
+        return
+    if args.queue and args.worker_id is None:
+        run_sharded(args)
+        return
+    if args.queue:
+        use_worker_files(args)
+    if args.replay:
+        replay(args, make_output_sink(args))
+        return
+    if args.synthetic:
+        generate_synthetic(args, make_output_sink(args))
+        return
     
-    print("Starting Simple Edge BlinkIt Scraper...")
+    discovery_cache = None
+    if not args.no_discovery_cache:
+        discovery_cache = DiscoveryCache(args.discovery_cache, ttl=args.discovery_ttl * 3600)
     
-    # Sample data points from the spreadsheet
-    sample_data = [
-        {'lat': 28.6139, 'lng': 77.2090, 'category': 'Snacks & Munchies', 'subcategory': 'Nachos'},
-        {'lat': 19.0760, 'lng': 72.8777, 'category': 'Beverages', 'subcategory': 'Soft Drinks'},
-        {'lat': 12.9716, 'lng': 77.5946, 'category': 'Dairy & Bakery', 'subcategory': 'Milk'},
-    ]
+    location_cache = LocationCache(args.location_cache, ttl=args.location_ttl * 3600)
     
-    all_results = []
+    # Build the pincode index once and share it between all workers
+    if args.pincode_csv:
+        pincode_index = PincodeIndex.from_csv(args.pincode_csv, max_distance_km=args.max_pincode_distance)
+    else:
+        pincode_index = PincodeIndex(DEFAULT_CENTROIDS, max_distance_km=args.max_pincode_distance)
+    
+    response_store = ResponseStore(args.store_responses) if args.store_responses else None
+    
+    exporters = []
+    if args.metrics_json:
+        exporters.append(make_exporter('json', args.metrics_json))
+    if args.metrics_prom:
+        exporters.append(make_exporter('prometheus', args.metrics_prom))
+    metrics = Metrics(exporters)
+    log = (lambda message: None) if args.quiet else print
     
-    for data_point in sample_data:
-        print(f"\nScraping data for {data_point['category']} > {data_point['subcategory']}")
-        results = scraper.scrape_category_data(
-            data_point['lat'], 
-            data_point['lng'], 
-            data_point['category'], 
-            data_point['subcategory']
+    rate_limiter = None
+    if not args.fixed_rate:
+        # Start at the pace --min-interval implies and adapt from there
+        rate_limiter = AdaptiveRateLimiter(
+            rate=1.0 / args.min_interval if args.min_interval > 0 else args.max_rate,
+            max_rate=args.max_rate
         )
+    
+    # Normalized output keeps static product attributes once per product, so
+    # scrapers skip extracting them for products already seen in the run
+    interner = ProductInterner() if args.format == 'normalized' else None
+    
+    engine = JobEngine(
+        lambda limiter: SimpleEdgeBlinkItScraper(
+            limiter=limiter,
+            discovery_cache=discovery_cache,
+            location_cache=location_cache,
+            pincode_index=pincode_index,
+            page_concurrency=args.page_concurrency,
+            response_store=response_store,
+            selective_decode=args.selective_decode,
+            base_url=args.base_url,
+            metrics=metrics,
+            quiet=args.quiet,
+            max_retries=args.max_retries,
+            interner=interner
+        ),
+        max_workers=args.workers,
+        per_host=args.per_host,
+        min_interval=args.min_interval,
+        rate_limiter=rate_limiter
+    )
+    
+    print("Starting Simple Edge BlinkIt Scraper...")
+    
+    if args.queue:
+        # Sharded worker: lease jobs from the shared queue, which also takes
+        # the manifest's place, and write this worker's own output shard
+        manifest = WorkQueue(args.queue, worker_id=args.worker_id, lease_seconds=args.lease_seconds)
+        jobs = manifest.iter_leased(batch_size=args.lease_batch or args.workers * 2)
+        os.makedirs(args.shard_dir, exist_ok=True)
+        args.output = os.path.join(args.shard_dir, f"{args.worker_id}.{EXTENSIONS[args.format]}")
+        append = True
+    else:
+        jobs = load_jobs(args)
         
-        if results:
-            all_results.extend(results)
-            print(f"Found {len(results)} products")
-        else:
-            print("No products found")
+        # Deduplicate and group jobs by location so each location is validated
+        # once and its jobs reuse warm caches and connections
+        planner = JobPlanner(pincode_index, window=args.plan_window)
+        jobs = iter_planned_jobs(planner.plan(jobs))
         
-        # Add delay to avoid rate limiting
-        time.sleep(2)
-    
-    # Save results to CSV
-    if all_results:
-        df = pd.DataFrame(all_results)
-        df.to_csv('blinkit_scraped_data_simple_edge.csv', index=False)
-        print(f"\nScraped data saved to blinkit_scraped_data_simple_edge.csv")
-        print(f"Total products scraped: {len(all_results)}")
-        print(f"CSV file contains {len(df.columns)} columns")
+        manifest = JobManifest(args.manifest)
+        if args.resume:
+            # Jobs answered with mock data run again; drop their mock rows
+            # first so the output does not end up with both
+            mock_jobs = manifest.mock_jobs(args.output)
+            if mock_jobs:
+                drop_jobs(args.output, args.format, mock_jobs)
+                print(f"Resume: dropped the mock rows of {len(mock_jobs)} jobs to retry them")
+            jobs = manifest.remaining(jobs)
+        else:
+            manifest.reset()
+        append = args.resume
+    
+    sink = make_output_sink(args, append=append, interner=interner)
+    sample_batch = None
+    # (job, endpoint) pairs whose rows are buffered but not yet durable on disk
+    completed = []
+    
+    def checkpoint():
+        manifest.mark_done(completed, args.output)
+        completed.clear()
+    
+    last_export = time.monotonic()
+    
+    # Jobs run concurrently; pacing between requests is handled by the engine's
+    # per-host limiter instead of a fixed sleep between jobs. Each job's products
+    # are handed to the sink as soon as the job finishes, and the job is marked
+    # done in the manifest once those rows are safely on disk.
+    try:
+        with sink:
+            for data_point, results, error in engine.run(jobs):
+                log(f"\nFinished {data_point['category']} > {data_point['subcategory']}")
+                if error:
+                    print(f"Job failed: {error}")
+                    metrics.inc('jobs_total', result='failed')
+                    manifest.mark_failed(data_point, error)
+                    continue
+                
+                flushed = False
+                if results is not None:
+                    # Empty results go to the sink too: for delta output they
+                    # mean the job's products were removed
+                    with metrics.timer('write'):
+                        flushed = sink.write(results)
+                if results:
+                    if sample_batch is None:
+                        sample_batch = results
+                    metrics.inc('jobs_total', result='mock' if results.source == 'mock' else 'ok')
+                    metrics.inc('products_total', len(results))
+                    log(f"Found {len(results)} products")
+                else:
+                    metrics.inc('jobs_total', result='empty')
+                    log("No products found")
+                completed.append((data_point, getattr(results, 'source', None)))
+                if flushed and sink.durable_flush:
+                    checkpoint()
+                if time.monotonic() - last_export >= args.metrics_interval:
+                    metrics.export()
+                    last_export = time.monotonic()
+        checkpoint()
+    except BaseException:
+        # The sink flushed what it had on the way out; record those jobs if
+        # the flushed rows are readable so --resume does not repeat them
+        if sink.durable_flush:
+            checkpoint()
+        raise
+    finally:
+        if discovery_cache is not None:
+            discovery_cache.save()
+        location_cache.save()
+        print(f"Job manifest: {manifest.counts()}")
+        manifest.close()
+        metrics.export()
+        print(f"Requests: {metrics.counter_total('requests_total')}, "
+              f"mock fallbacks: {metrics.counter_total('mock_fallback_total')}")
+        for line in metrics.stage_summary():
+            print(line)
+        if rate_limiter is not None:
+            for host, rate in rate_limiter.rates().items():
+                print(f"Settled request rate for {host}: {rate:.2f}/s")
+    
+    if args.format == 'delta':
+        print(f"Changes since the last run: {sink.change_counts}")
+    if args.format == 'normalized':
+        print(f"Product table: {sink.products_written} products in {sink.products_path}")
+    
+    if sink.rows_written:
+        print(f"\nScraped data saved to {args.output}")
+        print(f"Total products scraped: {sink.rows_written}")
+        print(f"Output file contains {len(sink.columns)} columns")
         
         # Show sample data
         print("\nSample data:")
-        print(df.head(3).to_string())
+        print(batches_to_frame([sample_batch], expand_flags=not args.packed_flags).head(3).to_string())
     else:
         print("No data was scraped successfully")
 
 if __name__ == "__main__":
-    main() 
+    main()
\ No newline at end of file
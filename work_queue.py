@@ -0,0 +1,266 @@
+import itertools
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from checkpoint import job_key
+
+
+def default_worker_id():
+    """host-pid, unique across the machines sharing one queue"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """SQLite work queue that worker processes lease jobs from
+
+    Jobs are enqueued once (duplicates are ignored) in planned order. A
+    worker leases a small batch at a time; a lease that is not renewed or
+    completed within `lease_seconds` expires and the job goes back to pending
+    for another worker, until it has been attempted `max_attempts` times.
+
+    It mirrors JobManifest's mark_done / mark_failed / counts / close, so a
+    worker records progress through it exactly as a single-process run does.
+    Workers on other machines can share the queue file, provided the shared
+    filesystem supports SQLite locking.
+    """
+
+    def __init__(self, path, worker_id=None, lease_seconds=300.0, max_attempts=3):
+        self.path = path
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS queue (
+                job_key TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                lat REAL,
+                lng REAL,
+                category TEXT,
+                subcategory TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                output TEXT,
+                endpoint TEXT,
+                error TEXT,
+                updated_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS queue_status ON queue (status, seq)")
+        self._heartbeat = None
+        self._stop_heartbeat = threading.Event()
+
+    def _transaction(self, statements):
+        """Run (sql, params) pairs in one write transaction"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            results = [self.conn.execute(sql, params) for sql, params in statements]
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return results
+
+    def enqueue(self, jobs, chunk_size=1000):
+        """Add jobs in order, ignoring ones already queued; returns how many were new"""
+        added = 0
+        next_seq = self.conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM queue").fetchone()[0]
+        jobs = iter(jobs)
+        while True:
+            chunk = list(itertools.islice(jobs, chunk_size))
+            if not chunk:
+                break
+            results = self._transaction([
+                ("""
+                    INSERT OR IGNORE INTO queue (job_key, seq, lat, lng, category, subcategory, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, (job_key(job), next_seq + i, job['lat'], job['lng'], job['category'],
+                      job['subcategory'], time.time()))
+                for i, job in enumerate(chunk)
+            ])
+            added += sum(result.rowcount for result in results)
+            next_seq += len(chunk)
+        return added
+
+    def _requeue_expired(self, now):
+        return [
+            ("""
+                UPDATE queue SET status = 'failed', worker = NULL, error = 'lease expired too often', updated_at = ?
+                WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+            """, (now, now, self.max_attempts)),
+            ("""
+                UPDATE queue SET status = 'pending', worker = NULL, updated_at = ?
+                WHERE status = 'leased' AND lease_expires < ?
+            """, (now, now)),
+        ]
+
+    def lease(self, n):
+        """Lease up to n pending jobs (re-queueing expired leases first)"""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in self._requeue_expired(now):
+                self.conn.execute(sql, params)
+            rows = self.conn.execute("""
+                SELECT job_key, lat, lng, category, subcategory FROM queue
+                WHERE status = 'pending' ORDER BY seq LIMIT ?
+            """, (n,)).fetchall()
+            self.conn.executemany("""
+                UPDATE queue SET status = 'leased', worker = ?, lease_expires = ?,
+                    attempts = attempts + 1, updated_at = ?
+                WHERE job_key = ?
+            """, [(self.worker_id, now + self.lease_seconds, now, row[0]) for row in rows])
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return [
+            {'lat': lat, 'lng': lng, 'category': category, 'subcategory': subcategory}
+            for _, lat, lng, category, subcategory in rows
+        ]
+
+    def _renew_sql(self):
+        return ("""
+            UPDATE queue SET lease_expires = ? WHERE status = 'leased' AND worker = ?
+        """, (time.time() + self.lease_seconds, self.worker_id))
+
+    def renew(self):
+        """Extend every lease this worker holds"""
+        self._transaction([self._renew_sql()])
+
+    def start_heartbeat(self):
+        """Renew this worker's leases every lease_seconds / 3 from a background thread
+
+        Jobs that are running or queued in the engine are renewed however long
+        they take, so only a worker that has died lets its leases expire.
+        """
+        if self._heartbeat is not None:
+            return
+        self._stop_heartbeat.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name='lease-heartbeat', daemon=True)
+        self._heartbeat.start()
+
+    def _beat(self):
+        # SQLite connections stay on the thread that opened them
+        conn = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        try:
+            while not self._stop_heartbeat.wait(self.lease_seconds / 3):
+                try:
+                    conn.execute(*self._renew_sql())
+                except sqlite3.Error as e:
+                    print(f"Lease renewal failed: {e}")
+        finally:
+            conn.close()
+
+    def stop_heartbeat(self):
+        if self._heartbeat is None:
+            return
+        self._stop_heartbeat.set()
+        self._heartbeat.join()
+        self._heartbeat = None
+
+    def outstanding(self):
+        """Jobs that are pending or leased by anyone"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM queue WHERE status IN ('pending', 'leased')"
+        ).fetchone()[0]
+
+    def next_expiry(self):
+        """Seconds until the earliest outstanding lease expires, or None if none are held"""
+        expires = self.conn.execute(
+            "SELECT MIN(lease_expires) FROM queue WHERE status = 'leased'"
+        ).fetchone()[0]
+        return None if expires is None else max(0.0, expires - time.time())
+
+    def iter_leased(self, batch_size=10):
+        """Stream jobs leased in small batches until nothing is left pending
+
+        Starts the lease heartbeat. Jobs still leased by other workers are
+        not waited for: the stream is consumed by the loop that marks our own
+        jobs done, so blocking here would hold up our results.
+        """
+        self.start_heartbeat()
+        while True:
+            jobs = self.lease(batch_size)
+            if not jobs:
+                return
+            yield from jobs
+
+    def mark_done(self, completed, output):
+        """Record (job, endpoint) pairs whose rows are durable in output
+
+        A job answered with mock data goes back to pending until it has been
+        attempted max_attempts times, and then stays 'mock' (see retry()).
+        Only jobs this worker still holds the lease on are updated: one whose
+        lease expired belongs to whichever worker re-leased it.
+        """
+        now = time.time()
+        self._transaction([
+            ("""
+                UPDATE queue SET
+                    status = CASE WHEN ? != 'mock' THEN 'done' WHEN attempts >= ? THEN 'mock' ELSE 'pending' END,
+                    output = ?, endpoint = ?, worker = ?, lease_expires = NULL, error = NULL, updated_at = ?
+                WHERE job_key = ? AND status = 'leased' AND worker = ?
+            """, (endpoint, self.max_attempts, output, endpoint, self.worker_id, now, job_key(job),
+                  self.worker_id))
+            for job, endpoint in completed
+        ])
+
+    def mark_failed(self, job, error):
+        """Give a failed job back to the queue, or fail it for good after max_attempts
+
+        Like mark_done, this only applies while this worker holds the lease.
+        """
+        now = time.time()
+        self._transaction([("""
+            UPDATE queue SET
+                status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                worker = NULL, lease_expires = NULL, error = ?, updated_at = ?
+            WHERE job_key = ? AND status = 'leased' AND worker = ?
+        """, (self.max_attempts, str(error), now, job_key(job), self.worker_id))])
+
+    def release(self):
+        """Return this worker's unfinished leases to the queue"""
+        now = time.time()
+        self._transaction([("""
+            UPDATE queue SET status = 'pending', worker = NULL, lease_expires = NULL,
+                attempts = MAX(attempts - 1, 0), updated_at = ?
+            WHERE status = 'leased' AND worker = ?
+        """, (now, self.worker_id))])
+
+    def retry(self, statuses=('mock', 'failed')):
+        """Put jobs that ended in mock data or failure back to pending; returns how many"""
+        now = time.time()
+        placeholders = ', '.join('?' for _ in statuses)
+        result, = self._transaction([(f"""
+            UPDATE queue SET status = 'pending', attempts = 0, worker = NULL, updated_at = ?
+            WHERE status IN ({placeholders})
+        """, (now, *statuses))])
+        return result.rowcount
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM queue GROUP BY status").fetchall())
+
+    def outputs(self):
+        """Output shards that finished jobs were written to"""
+        return [row[0] for row in self.conn.execute(
+            "SELECT DISTINCT output FROM queue WHERE output IS NOT NULL ORDER BY output"
+        )]
+
+    def finished_jobs(self, output):
+        """Keys of the finished jobs whose rows the queue credits to output"""
+        return {row[0] for row in self.conn.execute(
+            "SELECT job_key FROM queue WHERE output = ? AND status IN ('done', 'mock')", (output,)
+        )}
+
+    def close(self):
+        """Stop the heartbeat, release unfinished leases and close the connection"""
+        self.stop_heartbeat()
+        self.release()
+        self.conn.close()